@@ -86,6 +86,11 @@ RATE_LIMIT_DEFAULT = ["200 per day", "50 per hour"]
 RATE_LIMIT_LOGIN = "10 per minute"
 RATE_LIMIT_SYNC = "5 per minute"
 RATE_LIMIT_LOGS = "60 per minute"  # Höheres Limit für Log-Polling
+# Zähler-Backend: memory:// zählt pro Gunicorn-Worker; redis://... teilt die Limits über alle Worker
+RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://')
+# fixed-window: zwei Zähler pro Schlüssel, erlaubt aber bis zu doppelten Burst an Fenstergrenzen;
+# moving-window: exakt, speichert dafür einen Zeitstempel pro Treffer
+RATE_LIMIT_STRATEGY = os.getenv('RATE_LIMIT_STRATEGY', 'fixed-window')
 
 
 # --- Initialisierung ---
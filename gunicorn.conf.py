@@ -0,0 +1,28 @@
+"""
+Gunicorn-Konfiguration für den Web-Server.
+
+Die Routen warten überwiegend auf Netzwerk-I/O (Google OAuth, ICS-Validierung),
+daher laufen die Worker als Threads statt als einzelne synchrone Prozesse.
+"""
+
+import os
+
+bind = "0.0.0.0:8000"
+
+# gthread: mehrere Requests pro Worker, ohne dass ein langsamer Upstream
+# den ganzen Prozess blockiert
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Timeout für Requests (Standard: 30s), erhöht für Validierungen bei langsamen Netzwerken
+timeout = 60
+# Zeit für Worker bei Shutdown
+graceful_timeout = 30
+
+# Kein preload_app: Thread-Pools und Log-Writer-Threads auf Modulebene
+# überleben keinen fork() und werden daher erst im Worker erzeugt
+preload_app = False
+
+errorlog = "-"
+loglevel = "info"
@@ -5,7 +5,17 @@ Implementiert Flask-Login UserMixin und verwaltet Benutzerdaten.
 """
 
 import os
+import re
+import copy
 import json
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask_login import UserMixin
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request as GoogleRequest
@@ -18,6 +28,198 @@ from config import (
     decrypt
 )
 
+# Prozessweiter Cache für aufgefrischte Credentials:
+# user_id -> (verschlüsselter Token, Credentials, letzte Nutzung als time.monotonic())
+# Spart den Token-Refresh (HTTPS-Roundtrip zu Google) bei jedem Aufruf
+_credentials_cache = {}
+_credentials_cache_lock = threading.Lock()
+
+# Credentials gelten als abgelaufen, wenn sie in weniger als dieser Zeit ablaufen
+TOKEN_REFRESH_MARGIN = timedelta(seconds=60)
+
+# Hintergrund-Refresh: gecachte Credentials vorab erneuern, bevor sie ablaufen
+TOKEN_PREFETCH_MARGIN = timedelta(minutes=5)
+TOKEN_PREFETCH_INTERVAL = 60
+# Länger ungenutzte Einträge werden verworfen statt weiter aufgefrischt (Sekunden)
+TOKEN_PREFETCH_IDLE = 15 * 60
+_token_refresher_started = False
+
+
+# Gemeinsamer Transport für Token-Refresh und ID-Token-Prüfung:
+# eine Session mit Keep-Alive statt einer neuen TLS-Verbindung pro Aufruf
+_google_request = None
+_google_request_lock = threading.Lock()
+
+
+def get_google_request() -> GoogleRequest:
+    """Liefert den prozessweit geteilten GoogleRequest (Lazy-Loading)."""
+    global _google_request
+    if _google_request is None:
+        with _google_request_lock:
+            if _google_request is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(
+                    pool_connections=10,
+                    pool_maxsize=50,
+                    max_retries=Retry(total=3, backoff_factor=0.2),
+                ))
+                _google_request = GoogleRequest(session=session)
+    return _google_request
+
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class CertCachingRequest:
+    """Transport-Wrapper, der GET-Antworten (Google-Zertifikate) gemäß max-age cacht.
+    
+    id_token.verify_oauth2_token lädt die Zertifikate sonst bei jedem Login neu.
+    """
+    
+    def __init__(self, request):
+        self._request = request
+        self._cache = {}  # url -> (ablauf_monotonic, response)
+        self._lock = threading.Lock()
+    
+    def __call__(self, url, method='GET', body=None, headers=None, **kwargs):
+        if method != 'GET' or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, **kwargs)
+        
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        response = self._request(url, method=method, headers=headers, **kwargs)
+        if response.status == 200:
+            match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', '') or '')
+            if match:
+                with self._lock:
+                    self._cache[url] = (now + int(match.group(1)), response)
+        return response
+
+
+_id_token_request = None
+
+
+def get_id_token_request() -> CertCachingRequest:
+    """Transport für ID-Token-Prüfung mit gecachten Zertifikaten (Lazy-Loading)."""
+    global _id_token_request
+    if _id_token_request is None:
+        with _google_request_lock:
+            if _id_token_request is None:
+                _id_token_request = CertCachingRequest(get_google_request())
+    return _id_token_request
+
+
+# Prozessweiter User-Cache: data_file -> ((mtime_ns, size), geparste Daten)
+# Flask-Login lädt den User bei jedem Request (auch beim /logs-Polling); jeder Aufruf
+# bekommt ein eigenes User-Objekt mit Kopie der Daten, Änderungen bleiben bis save() lokal
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def _file_signature(path):
+    """(mtime_ns, size) der Datei oder None, falls sie nicht existiert."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _credentials_still_valid(creds) -> bool:
+    """Prüft, ob gecachte Credentials noch mindestens TOKEN_REFRESH_MARGIN gültig sind."""
+    if not creds.valid or creds.expiry is None:
+        return False
+    # google-auth speichert expiry als naive UTC-Zeit
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now > TOKEN_REFRESH_MARGIN
+
+
+def user_data_path(user_id: str) -> str:
+    """Pfad zur Konfigurationsdatei eines Users."""
+    return os.path.join(DATA_DIR, f"{user_id}.json")
+
+
+def user_log_path(user_id: str) -> str:
+    """Pfad zur Log-Datei eines Users (geteilt von Web-Server und Sync-Skript)."""
+    return os.path.join(DATA_DIR, f"{user_id}.log")
+
+
+def user_lock_path(user_id: str) -> str:
+    """Pfad zur Sync-Lock-Datei eines Users."""
+    return os.path.join(DATA_DIR, f"{user_id}.sync.lock")
+
+
+def invalidate_credentials(user_id: str):
+    """Entfernt gecachte Credentials eines Users (z.B. nach Logout oder Kontolöschung)."""
+    with _credentials_cache_lock:
+        _credentials_cache.pop(user_id, None)
+
+
+def _build_credentials(refresh_token: str) -> Credentials:
+    """Erstellt (noch nicht aufgefrischte) Credentials aus einem Refresh-Token."""
+    return Credentials(
+        token=None,
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=GOOGLE_CLIENT_ID,
+        client_secret=GOOGLE_CLIENT_SECRET,
+        scopes=GOOGLE_SCOPES
+    )
+
+
+def refresh_expiring_credentials() -> int:
+    """Frischt gecachte Credentials auf, die innerhalb von TOKEN_PREFETCH_MARGIN ablaufen.
+    
+    Länger als TOKEN_PREFETCH_IDLE ungenutzte Einträge werden stattdessen entfernt.
+    Aufgefrischt wird eine Kopie, die erst danach unter dem Lock eingesetzt wird;
+    Request-Threads behalten ihr bisheriges Objekt.
+    """
+    idle_before = time.monotonic() - TOKEN_PREFETCH_IDLE
+    with _credentials_cache_lock:
+        for user_id in [uid for uid, entry in _credentials_cache.items() if entry[2] < idle_before]:
+            del _credentials_cache[user_id]
+        entries = list(_credentials_cache.items())
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    refreshed = 0
+    for user_id, (encrypted_token, creds, _) in entries:
+        if creds.expiry is not None and creds.expiry - now > TOKEN_PREFETCH_MARGIN:
+            continue
+        try:
+            new_creds = _build_credentials(creds.refresh_token)
+            new_creds.refresh(get_google_request())
+        except Exception as e:
+            # Request-Pfad frischt beim nächsten Zugriff selbst auf
+            print(f"Fehler beim Hintergrund-Refresh des Tokens für User {user_id}: {e}")
+            invalidate_credentials(user_id)
+            continue
+        with _credentials_cache_lock:
+            current = _credentials_cache.get(user_id)
+            # Zwischenzeitlich invalidiert oder neu angemeldet: nichts überschreiben
+            if current is not None and current[0] == encrypted_token:
+                _credentials_cache[user_id] = (encrypted_token, new_creds, current[2])
+                refreshed += 1
+    return refreshed
+
+
+def _token_refresh_loop():
+    while True:
+        time.sleep(TOKEN_PREFETCH_INTERVAL)
+        refresh_expiring_credentials()
+
+
+def start_token_refresher():
+    """Startet den Hintergrund-Refresh einmal pro Prozess (im Worker, nicht vor dem fork)."""
+    global _token_refresher_started
+    with _credentials_cache_lock:
+        if _token_refresher_started:
+            return
+        _token_refresher_started = True
+    threading.Thread(target=_token_refresh_loop, name='token-refresh', daemon=True).start()
+
 
 class User(UserMixin):
     """
@@ -29,29 +231,65 @@ class User(UserMixin):
         data_file: Pfad zur Konfigurationsdatei
     """
     
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, data: dict | None = None):
         self.id = user_id
-        self.data_file = os.path.join(DATA_DIR, f"{self.id}.json")
-        self.data = self._load_data()
+        self.data_file = user_data_path(self.id)
+        self.data = self._load_data() if data is None else data
 
     def get_id(self) -> str:
         """Gibt die User-ID als String zurück (für Flask-Login)."""
         return str(self.id)
 
+    # --- Dateipfade (einmal pro User-Objekt berechnet) ---
+
+    @cached_property
+    def log_file(self) -> str:
+        """Pfad zur User-Log-Datei."""
+        return user_log_path(self.id)
+
+    @cached_property
+    def lock_file(self) -> str:
+        """Pfad zur Sync-Lock-Datei."""
+        return user_lock_path(self.id)
+
+    @cached_property
+    def cache_files(self) -> tuple:
+        """Pfade der Sync-Cache-Dateien (ICS-Metadaten, Events, ICS-Inhalt)."""
+        cache_dir = os.path.join(DATA_DIR, '.cache')
+        return tuple(
+            os.path.join(cache_dir, f"{self.id}_{suffix}")
+            for suffix in ('ics.json', 'events.json', 'ics.ics')
+        )
+
     def _load_data(self) -> dict:
         """Lädt Benutzerdaten aus der JSON-Datei."""
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
+                with open(self.data_file, 'rb') as f:
+                    return json.loads(f.read())
             except json.JSONDecodeError:
                 pass
         return {'id': self.id}
 
     def save(self):
         """Speichert Benutzerdaten in die JSON-Datei."""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        payload = json.dumps(self.data, indent=2)
+        # Atomar über temporäre Datei + os.replace: ein Absturz mitten im
+        # Schreiben hinterlässt nie eine abgeschnittene Benutzerdatei
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.data_file) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.data_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        signature = _file_signature(self.data_file)
+        with _user_cache_lock:
+            _user_cache[self.data_file] = (signature, copy.deepcopy(self.data))
 
     # --- Konfiguration ---
     
@@ -80,6 +318,7 @@ class User(UserMixin):
         self.data['email'] = email
         self.data['refresh_token_encrypted'] = encrypted_token
         self.save()
+        invalidate_credentials(self.id)
 
     def get_credentials(self) -> Credentials | None:
         """Entschlüsselt den Refresh-Token und gibt gültige Credentials zurück."""
@@ -87,17 +326,18 @@ class User(UserMixin):
         if not encrypted_token:
             return None
 
+        # Cache-Treffer über den verschlüsselten Token prüfen: Fernet-Decrypt nur bei Cache-Miss
+        with _credentials_cache_lock:
+            cached = _credentials_cache.get(self.id)
+            if cached and cached[0] == encrypted_token and _credentials_still_valid(cached[1]):
+                _credentials_cache[self.id] = (encrypted_token, cached[1], time.monotonic())
+                return cached[1]
+
         try:
-            refresh_token = decrypt(encrypted_token)
-            creds = Credentials(
-                token=None,
-                refresh_token=refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=GOOGLE_CLIENT_ID,
-                client_secret=GOOGLE_CLIENT_SECRET,
-                scopes=GOOGLE_SCOPES
-            )
-            creds.refresh(GoogleRequest())
+            creds = _build_credentials(decrypt(encrypted_token))
+            creds.refresh(get_google_request())
+            with _credentials_cache_lock:
+                _credentials_cache[self.id] = (encrypted_token, creds, time.monotonic())
             return creds
         except Exception as e:
             print(f"Fehler beim Aktualisieren des Tokens für User {self.id}: {e}")
@@ -118,26 +358,39 @@ class User(UserMixin):
     
     def delete(self):
         """Löscht alle Benutzerdaten (Konfiguration und Logs)."""
-        # Konfigurationsdatei löschen
-        if os.path.exists(self.data_file):
-            os.remove(self.data_file)
-        
-        # Log-Datei löschen
-        log_file = os.path.join(DATA_DIR, f"{self.id}.log")
-        if os.path.exists(log_file):
-            os.remove(log_file)
+        invalidate_credentials(self.id)
+        with _user_cache_lock:
+            _user_cache.pop(self.data_file, None)
         
-        # Cache-Dateien löschen
-        cache_dir = os.path.join(DATA_DIR, '.cache')
-        for cache_type in ['ics', 'events']:
-            cache_file = os.path.join(cache_dir, f"{self.id}_{cache_type}.json")
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
+        # Konfiguration, Log und Cache-Dateien löschen; fehlende Dateien überspringen
+        for path in (self.data_file, self.log_file, *self.cache_files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
     @staticmethod
     def exists(user_id: str) -> bool:
         """Prüft, ob ein Benutzer existiert."""
-        return os.path.exists(os.path.join(DATA_DIR, f"{user_id}.json"))
+        return os.path.exists(user_data_path(user_id))
+
+    @staticmethod
+    def get_cached(user_id: str) -> 'User':
+        """Wie User(user_id), nutzt aber die zuletzt geladenen Daten, solange die Datei unverändert ist."""
+        data_file = user_data_path(user_id)
+        signature = _file_signature(data_file)
+        if signature is None:
+            return User(user_id)
+        
+        with _user_cache_lock:
+            cached = _user_cache.get(data_file)
+        if cached and cached[0] == signature:
+            return User(user_id, data=copy.deepcopy(cached[1]))
+        
+        user = User(user_id)
+        with _user_cache_lock:
+            _user_cache[data_file] = (signature, copy.deepcopy(user.data))
+        return user
 
     @staticmethod
     def load(user_id: str) -> 'User | None':
@@ -9,7 +9,7 @@ echo "Starte Supercronic (Scheduler)..."
 supercronic /app/crontab &
 
 # Gunicorn starten
-# --timeout 60: Timeout für Requests (Standard: 30s), erhöht für Validierungen bei langsamen Netzwerken
-# --graceful-timeout 30: Zeit für Worker bei Shutdown
+# Worker, Threads und Timeouts siehe gunicorn.conf.py
+# (WEB_CONCURRENCY / GUNICORN_THREADS überschreiben die Standardwerte)
 echo "Starte Web-Server auf Port 8000..."
-exec gunicorn --workers 2 --bind 0.0.0.0:8000 --timeout 60 --graceful-timeout 30 "web_server:get_app()" --log-file - --log-level info
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py "web_server:get_app()"
@@ -2,15 +2,14 @@ import os
 import json
 import glob
 import sys
+import time
 import argparse
-from datetime import datetime
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request as GoogleRequest
-from googleapiclient.discovery import build
 from filelock import FileLock, Timeout
 
 # Importiere die geteilte Logik und Konfiguration
-from sync_logic import CalendarSyncer
+from sync_logic import CalendarSyncer, build_calendar_service
+from models import get_google_request, user_data_path, user_log_path, user_lock_path
 import config
 from config import (
     DATA_DIR, GOOGLE_SCOPES,
@@ -18,15 +17,39 @@ from config import (
     decrypt
 )
 
-def log(message):
-    print(f"[{datetime.now().isoformat()}] SYNC: {message}", flush=True)
+# (Sekunde, formatierter Sekunden-Anteil): Tupel-Zuweisung ist atomar, kein Lock nötig
+_timestamp_cache = (None, '')
 
-def build_credentials(user_data):
+def log_timestamp():
+    """Lokaler ISO-Zeitstempel mit Mikrosekunden; strftime nur einmal pro Sekunde."""
+    global _timestamp_cache
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _timestamp_cache
+    if second != cached_second:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+        _timestamp_cache = (second, prefix)
+    return f"{prefix}.{int((now - second) * 1_000_000):06d}"
+
+def log(message, writer=None):
+    """Schreibt eine Zeile mit Zeitstempel.
+    
+    writer: Callable, das die fertige Zeile erhält (z.B. der system.log-Writer des
+    Webservers); ohne writer wird auf stdout ausgegeben (Cron schreibt das in system.log).
+    """
+    line = f"[{log_timestamp()}] SYNC: {message}"
+    if writer is None:
+        print(line, flush=True)
+    else:
+        writer(line)
+
+def build_credentials(user_data, log_func=None):
     """Entschlüsselt Refresh-Token und erstellt Credentials."""
+    log_func = log_func or log
     try:
         encrypted_token = user_data.get('refresh_token_encrypted')
         if not encrypted_token:
-            log(f"Nutzer {user_data.get('email')} hat keinen Refresh-Token. Übersprungen.")
+            log_func(f"Nutzer {user_data.get('email')} hat keinen Refresh-Token. Übersprungen.")
             return None
             
         token_json = decrypt(encrypted_token)
@@ -40,13 +63,82 @@ def build_credentials(user_data):
             scopes=GOOGLE_SCOPES
         )
         
-        creds.refresh(GoogleRequest())
+        creds.refresh(get_google_request())
         return creds
         
     except Exception as e:
-        log(f"Fehler beim Entschlüsseln/Aktualisieren des Tokens für {user_data.get('email')}: {e}")
+        log_func(f"Fehler beim Entschlüsseln/Aktualisieren des Tokens für {user_data.get('email')}: {e}")
         return None
 
+def _sync_locked_user(user_id, user_data, wipe, log_func):
+    """Sync/Wipe für einen User; läuft, während dessen Sync-Lock gehalten wird."""
+    log_func(f"--- Verarbeite Nutzer: {user_data.get('email')} (ID: {user_id}) ---")
+    
+    if not user_data.get('source_id') or not user_data.get('target_id'):
+        log_func(f"Nutzer {user_id} hat Setup nicht abgeschlossen. Übersprungen.")
+        return
+
+    creds = build_credentials(user_data, log_func=log_func)
+    if not creds:
+        return
+        
+    service = build_calendar_service(creds)
+    
+    syncer = CalendarSyncer(service, log_callback=log_func, user_log_file=user_log_path(user_id), user_id=user_id)
+    try:
+        if wipe:
+            # Wipe-Modus: Alle Events im Zielkalender löschen
+            target_id = user_data.get('target_id')
+            source_id = user_data.get('source_id')
+            syncer.log_user("Zielkalender wird geleert...")
+            log_func(f"Wipe-Target gestartet für target={target_id}")
+            try:
+                syncer.clear_cache()
+                created_count, deleted_count = syncer.sync_to_target(target_id, [], None, None, source_id=source_id)
+                syncer.log_user(f"Zielkalender geleert ({deleted_count} Einträge entfernt).")
+                log_func(f"Wipe-Target abgeschlossen: deleted={deleted_count}")
+            except Exception as wipe_error:
+                syncer.log_user(f"Fehler beim Leeren: {wipe_error}")
+                log_func(f"Wipe-Target FEHLER: {wipe_error}")
+                raise
+        else:
+            # Normaler Sync-Modus
+            syncer.run_sync(user_data)
+    finally:
+        syncer.close()
+    
+    log_func(f"--- {'Wipe' if wipe else 'Sync'} für Nutzer {user_id} abgeschlossen ---")
+
+def process_user_file(user_file, wipe=False, log_func=None):
+    """Synchronisiert (oder leert bei wipe=True) den Benutzer aus einer Konfigurationsdatei."""
+    log_func = log_func or log
+    try:
+        with open(user_file, 'r') as f:
+            user_data = json.load(f)
+        
+        user_id = user_data.get('id', 'unbekannt')
+        
+        # File-Lock gegen parallele Syncs; der with-Block gibt ihn auch bei Fehlern frei
+        try:
+            with FileLock(user_lock_path(user_id), timeout=2):
+                _sync_locked_user(user_id, user_data, wipe, log_func)
+        except Timeout:
+            log_func(f"!!! WARNUNG: Sync für User {user_id} läuft bereits. Überspringe diesen Lauf.")
+        
+    except Exception as e:
+        log_func(f"FEHLER bei der Verarbeitung von Datei {user_file}: {e}")
+
+def run_for_user(user_id, wipe=False, log_func=None):
+    """Synchronisiert einen einzelnen Benutzer im laufenden Prozess (z.B. aus dem Webserver)."""
+    log_func = log_func or log
+    log_func(f"Starte manuellen Sync-Lauf für einzelnen Benutzer: {user_id}...")
+    user_file_path = user_data_path(user_id)
+    if not os.path.exists(user_file_path):
+        log_func(f"FEHLER: Konfigurationsdatei {user_file_path} für User {user_id} nicht gefunden.")
+        return
+    process_user_file(user_file_path, wipe=wipe, log_func=log_func)
+    log_func("Sync-Lauf beendet.")
+
 def main():
     try:
         config.validate_config()
@@ -63,19 +155,14 @@ def main():
         log("FEHLER: --wipe erfordert --user")
         sys.exit(1)
     
-    user_files = []
     if args.user:
         # Einzelner User (manueller Sync)
-        log(f"Starte manuellen Sync-Lauf für einzelnen Benutzer: {args.user}...")
-        user_file_path = os.path.join(DATA_DIR, f"{args.user}.json")
-        if os.path.exists(user_file_path):
-            user_files.append(user_file_path)
-        else:
-            log(f"FEHLER: Konfigurationsdatei {user_file_path} für User {args.user} nicht gefunden.")
-    else:
-        # Alle User (Cron-Job)
-        log("Starte stündlichen Sync-Lauf für alle Benutzer...")
-        user_files = glob.glob(os.path.join(DATA_DIR, '*.json'))
+        run_for_user(args.user, wipe=args.wipe)
+        return
+    
+    # Alle User (Cron-Job)
+    log("Starte stündlichen Sync-Lauf für alle Benutzer...")
+    user_files = glob.glob(os.path.join(DATA_DIR, '*.json'))
     
     if not user_files:
         log("Keine Benutzer-Konfigurationsdateien zum Verarbeiten gefunden.")
@@ -84,71 +171,7 @@ def main():
     log(f"{len(user_files)} Benutzerkonfiguration(en) gefunden.")
 
     for user_file in user_files:
-        user_id = None
-        lock = None
-        lock_acquired = False
-        try:
-            with open(user_file, 'r') as f:
-                user_data = json.load(f)
-            
-            user_id = user_data.get('id', 'unbekannt')
-            
-            # File-Lock gegen parallele Syncs
-            lock_file = os.path.join(DATA_DIR, f"{user_id}.sync.lock")
-            lock = FileLock(lock_file)
-
-            try:
-                lock.acquire(timeout=2)
-                lock_acquired = True
-            except Timeout:
-                log(f"!!! WARNUNG: Sync für User {user_id} läuft bereits. Überspringe diesen Lauf.")
-                continue
-
-            log(f"--- Verarbeite Nutzer: {user_data.get('email')} (ID: {user_id}) ---")
-            
-            if not user_data.get('source_id') or not user_data.get('target_id'):
-                log(f"Nutzer {user_id} hat Setup nicht abgeschlossen. Übersprungen.")
-                continue
-
-            creds = build_credentials(user_data)
-            if not creds:
-                continue
-                
-            service = build('calendar', 'v3', credentials=creds)
-            
-            user_log_path = os.path.join(DATA_DIR, f"{user_id}.log")
-            
-            syncer = CalendarSyncer(service, log_callback=log, user_log_file=user_log_path, user_id=user_id)
-            
-            if args.wipe:
-                # Wipe-Modus: Alle Events im Zielkalender löschen
-                target_id = user_data.get('target_id')
-                source_id = user_data.get('source_id')
-                syncer.log_user("Zielkalender wird geleert...")
-                log(f"Wipe-Target gestartet für target={target_id}")
-                try:
-                    syncer.clear_cache()
-                    created_count, deleted_count = syncer.sync_to_target(target_id, [], None, None, source_id=source_id)
-                    syncer.log_user(f"Zielkalender geleert ({deleted_count} Einträge entfernt).")
-                    log(f"Wipe-Target abgeschlossen: deleted={deleted_count}")
-                except Exception as wipe_error:
-                    syncer.log_user(f"Fehler beim Leeren: {wipe_error}")
-                    log(f"Wipe-Target FEHLER: {wipe_error}")
-                    raise
-            else:
-                # Normaler Sync-Modus
-                syncer.run_sync(user_data)
-            
-            log(f"--- {'Wipe' if args.wipe else 'Sync'} für Nutzer {user_id} abgeschlossen ---")
-            
-        except Exception as e:
-            log(f"FEHLER bei der Verarbeitung von Datei {user_file}: {e}")
-        finally:
-            if lock_acquired and lock and lock.is_locked:
-                try:
-                    lock.release()
-                except Exception:
-                    pass
+        process_user_file(user_file, wipe=args.wipe)
 
     log("Sync-Lauf beendet.")
 
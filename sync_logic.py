@@ -3,10 +3,19 @@ import os
 import json
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 import arrow
+from arrow.parser import TzinfoParser
 import time
 import socket
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
+from http.cookiejar import DefaultCookiePolicy
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
 from googleapiclient.errors import HttpError
 from ics import Calendar
 
@@ -15,16 +24,145 @@ from ics import Calendar
 DATA_DIR = os.getenv('DATA_DIR', '/app/data')
 CACHE_DIR = os.path.join(DATA_DIR, '.cache')
 
+# Prozessweiter ICS-Cache: URL -> (etag, last_modified, content)
+# Spart im laufenden Webserver beim 304-Pfad das Lesen der Cache-Dateien
+ICS_MEMORY_CACHE_SIZE = 256
+_ics_memory_cache = OrderedDict()
+_ics_memory_cache_lock = threading.Lock()
+
+
+def _get_cached_ics(url):
+    with _ics_memory_cache_lock:
+        return _ics_memory_cache.get(url)
+
+
+def _remember_ics(url, etag, last_modified, content):
+    with _ics_memory_cache_lock:
+        _ics_memory_cache[url] = (etag, last_modified, content)
+        _ics_memory_cache.move_to_end(url)
+        while len(_ics_memory_cache) > ICS_MEMORY_CACHE_SIZE:
+            _ics_memory_cache.popitem(last=False)
+
+
+def _forget_ics(url):
+    with _ics_memory_cache_lock:
+        _ics_memory_cache.pop(url, None)
+
+
+# Geteilte HTTP-Session für ICS-Abrufe: Keep-Alive zum (meist gleichen) Kalender-Host
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Liefert die prozessweit geteilte requests.Session für ICS-Abrufe (Lazy-Loading).
+    
+    Cookies werden abgelehnt, damit nichts zwischen den ICS-URLs verschiedener User geteilt wird.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+
+@lru_cache(maxsize=256)
+def compile_filter_pattern(pattern):
+    """Kompiliert ein Filtermuster (case-insensitive) und merkt es sich über Syncs hinweg.
+
+    Ungültige Muster werfen re.error und werden nicht gecacht.
+    """
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# Titel und Orte wiederholen sich bei wöchentlichen Vorlesungen hundertfach;
+# identische Strings teilen sich so ein Objekt (begrenzt gegen unbeschränktes Wachstum)
+_INTERN_MAX_SIZE = 10_000
+_interned_strings = {}
+
+
+def _intern_str(value):
+    if not isinstance(value, str):
+        return value
+    interned = _interned_strings.get(value)
+    if interned is None:
+        if len(_interned_strings) >= _INTERN_MAX_SIZE:
+            _interned_strings.clear()
+        interned = _interned_strings.setdefault(value, value)
+    return interned
+
+
+_REGEX_META_RE = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+def _is_ascii_literal(pattern):
+    """True, wenn das Muster reiner ASCII-Text ohne Regex-Sonderzeichen ist."""
+    return pattern.isascii() and not _REGEX_META_RE.search(pattern)
+
+
+def _atomic_write_text(path, text):
+    """Schreibt Text über eine temporäre Datei und os.replace.
+    
+    Leser sehen nie eine halb geschriebene Datei. Kein fsync, da der Cache
+    jederzeit neu aufgebaut werden kann.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@lru_cache(maxsize=32)
+def _resolve_timezone(name):
+    """Löst einen Zeitzonennamen einmal auf, statt ihn pro Event von arrow parsen zu lassen."""
+    return TzinfoParser.parse(name)
+
+
+@lru_cache(maxsize=1)
+def _calendar_discovery_doc():
+    """Mitgeliefertes Calendar-v3-Discovery-Dokument (einmal pro Prozess von der Platte gelesen)."""
+    return discovery_cache.get_static_doc('calendar', 'v3')
+
+
+def build_calendar_service(creds):
+    """Wie build('calendar', 'v3'), aber mit geteiltem Discovery-Dokument.
+    
+    Das Resource-Objekt selbst ist nicht threadsicher und wird pro Aufruf neu gebaut.
+    """
+    return build_from_document(_calendar_discovery_doc(), credentials=creds)
+
+
+def _time_str(value):
+    """Liefert dateTime bzw. date aus einem Start-/End-Dict (oder '')."""
+    if not value:
+        return ''
+    return value.get('dateTime') or value.get('date') or ''
+
 
 class CalendarSyncer:
-    def __init__(self, service, log_callback=print, user_log_file=None, user_id=None):
+    def __init__(self, service, log_callback=print, user_log_file=None, user_id=None, cache_dir=None):
         self.service = service
         self.system_log = log_callback  # Dies ist print() -> geht an system.log/docker logs
         self.user_log_file = user_log_file  # Pfad zur <user_id>.log
         self.user_id = user_id  # Für Cache-Dateien
+        self.cache_dir = cache_dir or CACHE_DIR  # Überschreibbar, z.B. für Tests
+        self._user_log_handle = None  # Wird beim ersten Schreiben geöffnet
         
         # Cache-Verzeichnis erstellen
-        os.makedirs(CACHE_DIR, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
 
     def log(self, message, user_message=None):
         """Schreibt in den System-Log und optional in den User-Log."""
@@ -34,8 +172,7 @@ class CalendarSyncer:
         # 2. Nur wenn user_message gesetzt ist, in die User-Log-Datei schreiben
         if user_message and self.user_log_file:
             try:
-                with open(self.user_log_file, 'a') as f:
-                    f.write(user_message + '\n')
+                self._write_user_log(user_message + '\n')
             except Exception as e:
                 self.system_log(f"!!! LOG-FEHLER: Konnte nicht in User-Log schreiben: {e}")
     
@@ -47,12 +184,30 @@ class CalendarSyncer:
                 # Log-Rotation: Datei kürzen wenn älter als 30 Tage
                 self._rotate_log_if_needed()
                 
-                with open(self.user_log_file, 'a') as f:
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
-                    f.write(f"[{timestamp}] {message}\n")
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+                self._write_user_log(f"[{timestamp}] {message}\n")
             except Exception as e:
                 self.system_log(f"!!! LOG-FEHLER: Konnte nicht in User-Log schreiben: {e}")
 
+    def _write_user_log(self, line):
+        """Schreibt eine Zeile über den offen gehaltenen User-Log-Handle.
+        
+        Zeilenpufferung: jede Zeile ist sofort in der Datei (Log-Ansicht im
+        Dashboard), aber die Datei wird nicht für jede Zeile neu geöffnet.
+        """
+        if self._user_log_handle is None:
+            self._user_log_handle = open(self.user_log_file, 'a', buffering=1, encoding='utf-8')
+        self._user_log_handle.write(line)
+
+    def close(self):
+        """Schließt den User-Log-Handle (am Ende eines Syncs aufrufen)."""
+        if self._user_log_handle is not None:
+            try:
+                self._user_log_handle.close()
+            except Exception:
+                pass
+            self._user_log_handle = None
+
     def _rotate_log_if_needed(self):
         """Löscht Log-Einträge älter als 30 Tage."""
         if not self.user_log_file or not os.path.exists(self.user_log_file):
@@ -65,18 +220,22 @@ class CalendarSyncer:
             
             # Wenn Datei älter als 30 Tage, komplett neu starten
             if file_age_days > 30:
+                self.close()  # Handle würde sonst in die gelöschte Datei schreiben
                 os.remove(self.user_log_file)
                 self.system_log(f"Log-Rotation: {self.user_log_file} gelöscht (älter als 30 Tage)")
                 return
             
             # Alternativ: Bei großen Dateien (>1MB) die ältesten Zeilen entfernen
             if file_stat.st_size > 1_000_000:  # 1 MB
+                # Zeilenweise streamen und nur die letzten 1001 Zeilen halten statt der ganzen Datei
                 with open(self.user_log_file, 'r') as f:
-                    lines = f.readlines()
+                    lines = deque(f, maxlen=1001)
                 # Behalte nur die letzten 1000 Zeilen
                 if len(lines) > 1000:
+                    lines.popleft()
+                    self.close()
                     with open(self.user_log_file, 'w') as f:
-                        f.writelines(lines[-1000:])
+                        f.writelines(lines)
                     self.system_log(f"Log-Rotation: {self.user_log_file} auf 1000 Zeilen gekürzt")
         except Exception as e:
             self.system_log(f"Log-Rotation Fehler: {e}")
@@ -87,7 +246,7 @@ class CalendarSyncer:
         """Gibt den Pfad zur Cache-Datei für diesen User zurück."""
         if not self.user_id:
             return None
-        return os.path.join(CACHE_DIR, f"{self.user_id}_{cache_type}.json")
+        return os.path.join(self.cache_dir, f"{self.user_id}_{cache_type}.json")
     
     def _load_cache(self, cache_type):
         """Lädt Cache-Daten aus Datei."""
@@ -95,8 +254,8 @@ class CalendarSyncer:
         if not cache_path or not os.path.exists(cache_path):
             return {}
         try:
-            with open(cache_path, 'r') as f:
-                return json.load(f)
+            with open(cache_path, 'rb') as f:
+                return json.loads(f.read())
         except Exception:
             return {}
     
@@ -106,22 +265,53 @@ class CalendarSyncer:
         if not cache_path:
             return
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f)
+            # Kompakte Trennzeichen: der Cache wird nur maschinell gelesen
+            _atomic_write_text(cache_path, json.dumps(data, separators=(',', ':')))
         except Exception as e:
             self.log(f"Cache-Fehler: Konnte {cache_type} nicht speichern: {e}")
     
+    def _get_ics_body_path(self):
+        """Pfad zur Datei mit dem rohen ICS-Inhalt (getrennt von den JSON-Metadaten)."""
+        if not self.user_id:
+            return None
+        return os.path.join(self.cache_dir, f"{self.user_id}_ics.ics")
+    
+    def _load_ics_body(self):
+        """Lädt den zwischengespeicherten ICS-Inhalt oder None."""
+        body_path = self._get_ics_body_path()
+        if not body_path or not os.path.exists(body_path):
+            return None
+        try:
+            with open(body_path, 'r', encoding='utf-8', newline='') as f:
+                return f.read()
+        except Exception:
+            return None
+    
+    def _save_ics_body(self, content):
+        """Speichert den rohen ICS-Inhalt ohne JSON-Kodierung."""
+        body_path = self._get_ics_body_path()
+        if not body_path:
+            return False
+        try:
+            _atomic_write_text(body_path, content)
+            return True
+        except Exception as e:
+            self.log(f"Cache-Fehler: Konnte ICS-Inhalt nicht speichern: {e}")
+            return False
+    
     def _compute_event_hash(self, event):
         """Berechnet einen Hash für ein Event zur Delta-Erkennung."""
-        # Erstelle einen eindeutigen String aus den Event-Daten
-        hash_input = json.dumps({
-            'summary': event.get('summary', ''),
-            'description': event.get('description', ''),
-            'location': event.get('location', ''),
-            'start': event.get('start', {}),
-            'end': event.get('end', {}),
-        }, sort_keys=True)
-        return hashlib.md5(hash_input.encode()).hexdigest()
+        # Feste Feldreihenfolge mit Trennzeichen statt json.dumps(sort_keys=True)
+        hash_input = '\x1f'.join((
+            event.get('summary') or '',
+            event.get('description') or '',
+            event.get('location') or '',
+            _time_str(event.get('start')),
+            (event.get('start') or {}).get('timeZone') or '',
+            _time_str(event.get('end')),
+            (event.get('end') or {}).get('timeZone') or '',
+        ))
+        return hashlib.blake2b(hash_input.encode(), digest_size=16).hexdigest()
     
     def _get_event_key(self, event):
         """Erstellt einen eindeutigen Schlüssel für ein Event (für Delta-Sync).
@@ -133,28 +323,23 @@ class CalendarSyncer:
         2. Fallback: Start + Ende + Titel + Ort
            - Für Events ohne UID
         """
+        start_str = _time_str(event.get('start'))
+        
         # Primär: UID-basierter Key (stabil bei Änderungen)
         uid = event.get('uid') or event.get('recurringEventId')
         if uid:
-            start = event.get('start', {})
-            start_str = start.get('dateTime') or start.get('date') or ''
             return f"uid:{uid}|{start_str}"
         
         # Fallback: Zeitbasierter Key
-        start = event.get('start', {})
-        end = event.get('end', {})
-        start_str = start.get('dateTime') or start.get('date') or ''
-        end_str = end.get('dateTime') or end.get('date') or ''
-        summary = event.get('summary', '')
-        location = event.get('location', '')
-        return f"{start_str}|{end_str}|{summary}|{location}"
+        end_str = _time_str(event.get('end'))
+        return f"{start_str}|{end_str}|{event.get('summary', '')}|{event.get('location', '')}"
 
     def standardize_event(self, event_data, source_type):
         if source_type == 'google':
             return {
-                'summary': event_data.get('summary', 'Kein Titel'),
+                'summary': _intern_str(event_data.get('summary', 'Kein Titel')),
                 'description': event_data.get('description', ''),
-                'location': event_data.get('location', ''),
+                'location': _intern_str(event_data.get('location', '')),
                 'start': event_data.get('start'),
                 'end': event_data.get('end'),
                 # Für wiederkehrende Events: recurringEventId als stabiler Identifier
@@ -181,9 +366,9 @@ class CalendarSyncer:
                 event_uid = str(event_data.uid)
             
             return {
-                'summary': event_data.name or 'Kein Titel',
+                'summary': _intern_str(event_data.name or 'Kein Titel'),
                 'description': event_data.description or '',
-                'location': event_data.location or '',
+                'location': _intern_str(event_data.location or ''),
                 'start': start,
                 'end': end,
                 'uid': event_uid,
@@ -210,9 +395,9 @@ class CalendarSyncer:
             event_uid = str(event_data.uid)
         
         return {
-            'summary': event_data.name or 'Kein Titel',
+            'summary': _intern_str(event_data.name or 'Kein Titel'),
             'description': event_data.description or '',
-            'location': event_data.location or '',
+            'location': _intern_str(event_data.location or ''),
             'start': start,
             'end': end,
             'uid': event_uid,
@@ -241,7 +426,7 @@ class CalendarSyncer:
 
                 events_result = self.service.events().list(**params).execute()
                 items = events_result.get('items', [])
-                all_events.extend([self.standardize_event(e, 'google') for e in items])
+                all_events.extend(self.standardize_event(e, 'google') for e in items)
                 
                 page_token = events_result.get('nextPageToken')
                 if not page_token:
@@ -262,26 +447,41 @@ class CalendarSyncer:
         
         try:
             # ETag/Last-Modified Caching
-            ics_cache = self._load_cache('ics')
-            cached_etag = ics_cache.get('etag')
-            cached_last_modified = ics_cache.get('last_modified')
-            cached_content = ics_cache.get('content')
+            # Zuerst im Speicher nachsehen, erst dann die Cache-Dateien lesen
+            memory_entry = _get_cached_ics(url)
+            if memory_entry:
+                ics_cache = {}
+                cached_etag, cached_last_modified, cached_body = memory_entry
+                has_cached_body = True
+            else:
+                ics_cache = self._load_cache('ics')
+                cached_etag = ics_cache.get('etag')
+                cached_last_modified = ics_cache.get('last_modified')
+                cached_body = None
+                # Der ICS-Inhalt liegt in einer eigenen Datei ('content' = älteres Cache-Format)
+                body_path = self._get_ics_body_path()
+                has_cached_body = 'content' in ics_cache or bool(body_path and os.path.exists(body_path))
             
             headers = {}
-            if cached_etag:
-                headers['If-None-Match'] = cached_etag
-            if cached_last_modified:
-                headers['If-Modified-Since'] = cached_last_modified
+            if has_cached_body:
+                if cached_etag:
+                    headers['If-None-Match'] = cached_etag
+                if cached_last_modified:
+                    headers['If-Modified-Since'] = cached_last_modified
             
             # User-Agent setzen um Blocks durch manche Server zu vermeiden
             headers['User-Agent'] = 'DHBW-Calendar-Cleaner/1.0 (https://github.com/STAINCABLER/DHBW_Calendar_Cleaner)'
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = get_http_session().get(url, headers=headers, timeout=30)
             
             # 304 Not Modified = ICS hat sich nicht geändert
-            if response.status_code == 304 and cached_content:
+            ics_content = None
+            if response.status_code == 304:
+                ics_content = cached_body or ics_cache.get('content') or self._load_ics_body()
+            if ics_content:
                 self.log("ICS: 304 Not Modified, Cache verwendet")
-                ics_content = cached_content
+                if not memory_entry:
+                    _remember_ics(url, cached_etag, cached_last_modified, ics_content)
             else:
                 response.raise_for_status()
                 ics_content = response.text
@@ -290,19 +490,22 @@ class CalendarSyncer:
                 new_etag = response.headers.get('ETag')
                 new_last_modified = response.headers.get('Last-Modified')
                 if new_etag or new_last_modified:
-                    self._save_cache('ics', {
-                        'etag': new_etag,
-                        'last_modified': new_last_modified,
-                        'content': ics_content,
-                        'source_url': url,  # URL speichern für Cache-Invalidierung
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    })
-                    self.log(f"ICS: Cache aktualisiert (ETag={new_etag is not None})")
+                    _remember_ics(url, new_etag, new_last_modified, ics_content)
+                    if self._save_ics_body(ics_content):
+                        self._save_cache('ics', {
+                            'etag': new_etag,
+                            'last_modified': new_last_modified,
+                            'source_url': url,  # URL speichern für Cache-Invalidierung
+                            'timestamp': datetime.now(timezone.utc).isoformat()
+                        })
+                        self.log(f"ICS: Cache aktualisiert (ETag={new_etag is not None})")
             
             calendar = Calendar(ics_content)
+            source_tzinfo = _resolve_timezone(source_timezone)
             
             events = []
             seen_uids = set()  # Deduplizierung nach UID
+            seen_keys = set()  # Deduplizierung nach Event-Key (Events ohne UID)
             duplicate_count = 0
             skipped_count = 0
             
@@ -330,9 +533,9 @@ class CalendarSyncer:
                     # Prüfe ob es ein ganztägiges Event ist (date statt datetime)
                     # Bei ganztägigen Events hat Arrow kein .naive Attribut
                     if hasattr(start_arrow, 'naive'):
-                        start_arrow = arrow.get(start_arrow.naive, tzinfo=source_timezone)
+                        start_arrow = arrow.get(start_arrow.naive, tzinfo=source_tzinfo)
                     if hasattr(end_arrow, 'naive'):
-                        end_arrow = arrow.get(end_arrow.naive, tzinfo=source_timezone)
+                        end_arrow = arrow.get(end_arrow.naive, tzinfo=source_tzinfo)
                     
                     # Validierung: Start muss vor Ende sein
                     if start_arrow >= end_arrow:
@@ -342,11 +545,19 @@ class CalendarSyncer:
                         continue
 
                     # Zeitfilter (nutze die konvertierten Zeiten)
-                    if time_min_dt is None or time_max_dt is None:
-                        events.append(self._standardize_ics_event(event, start_arrow, end_arrow))
-                    else:
-                        if end_arrow > time_min_dt and start_arrow < time_max_dt:
-                            events.append(self._standardize_ics_event(event, start_arrow, end_arrow))
+                    if time_min_dt is not None and time_max_dt is not None:
+                        if not (end_arrow > time_min_dt and start_arrow < time_max_dt):
+                            continue
+
+                    std_event = self._standardize_ics_event(event, start_arrow, end_arrow)
+                    if not event_uid:
+                        # Ohne UID: identische Events über den Event-Key erkennen
+                        event_key = self._get_event_key(std_event)
+                        if event_key in seen_keys:
+                            duplicate_count += 1
+                            continue
+                        seen_keys.add(event_key)
+                    events.append(std_event)
                 except Exception as e:
                     skipped_count += 1
                     event_name = getattr(event, 'name', 'Unbekannt')
@@ -385,7 +596,7 @@ class CalendarSyncer:
             if not pattern:
                 continue
             try:
-                regex_patterns.append(re.compile(pattern, re.IGNORECASE))
+                regex_patterns.append(compile_filter_pattern(pattern))
             except re.error as e:
                 invalid_count += 1
                 self.log(f"Ungültiges RegEx '{pattern}': {e}")
@@ -398,12 +609,32 @@ class CalendarSyncer:
         if not regex_patterns:
             return events, 0
 
+        # Bestehen alle Muster nur aus ASCII-Text ohne Regex-Sonderzeichen (häufigster Fall),
+        # genügt für ASCII-Titel eine Teilstring-Suche auf den kleingeschriebenen Text
+        literals = None
+        if all(_is_ascii_literal(pattern.pattern) for pattern in regex_patterns):
+            literals = [pattern.pattern.lower() for pattern in regex_patterns]
+
+        # Mehrere Muster als eine Alternation prüfen (ein search() pro Event).
+        # Nur ohne Gruppen, da sich sonst Rückverweise wie \1 verschieben würden.
+        if len(regex_patterns) > 1 and not any(pattern.groups for pattern in regex_patterns):
+            try:
+                regex_patterns = [compile_filter_pattern(
+                    '|'.join(f'(?:{pattern.pattern})' for pattern in regex_patterns)
+                )]
+            except re.error:
+                pass  # z.B. Inline-Flags mitten im Muster - einzeln prüfen
+
         filtered_events = []
         excluded_count = 0
         
         for event in events:
             summary = event['summary']
-            is_excluded = any(pattern.search(summary) for pattern in regex_patterns)
+            if literals is not None and summary.isascii():
+                lowered = summary.lower()
+                is_excluded = any(literal in lowered for literal in literals)
+            else:
+                is_excluded = any(pattern.search(summary) for pattern in regex_patterns)
             if not is_excluded:
                 filtered_events.append(event)
             else:
@@ -580,7 +811,7 @@ class CalendarSyncer:
         if events_to_create:
             self.log(f"Batch-Insert: {len(events_to_create)} Events werden erstellt")
             created_ids = self._batch_create_events(target_id, events_to_create, max_attempts)
-            created_count = len([x for x in created_ids if x])
+            created_count = sum(1 for x in created_ids if x)
             
             # Update cached_event_ids mit neuen IDs
             for i, key in enumerate(keys_for_new_events):
@@ -724,14 +955,24 @@ class CalendarSyncer:
     
     def clear_cache(self):
         """Löscht den Cache für diesen User (für Full-Sync oder Reset)."""
-        for cache_type in ['ics', 'events']:
-            cache_path = self._get_cache_path(cache_type)
-            if cache_path and os.path.exists(cache_path):
-                try:
-                    os.remove(cache_path)
-                    self.log(f"Cache '{cache_type}' gelöscht")
-                except Exception as e:
-                    self.log(f"Cache-Löschfehler '{cache_type}': {e}")
+        source_url = self._load_cache('ics').get('source_url')
+        if source_url:
+            _forget_ics(source_url)
+        cache_paths = {
+            'ics': self._get_cache_path('ics'),
+            'events': self._get_cache_path('events'),
+            'ics-inhalt': self._get_ics_body_path(),
+        }
+        for cache_type, cache_path in cache_paths.items():
+            if not cache_path:
+                continue
+            try:
+                os.remove(cache_path)
+                self.log(f"Cache '{cache_type}' gelöscht")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                self.log(f"Cache-Löschfehler '{cache_type}': {e}")
 
     def run_sync(self, config):
         """Führt den gesamten Sync-Prozess für eine gegebene Konfiguration aus."""
@@ -756,12 +997,13 @@ class CalendarSyncer:
             cached_source_url = ics_cache.get('source_url')
             if cached_source_url and cached_source_url != SOURCE_CALENDAR_ID:
                 self.log(f"Quellkalender geändert - ICS-Cache wird gelöscht")
-                cache_path = self._get_cache_path('ics')
-                if cache_path and os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception:
-                        pass
+                _forget_ics(cached_source_url)
+                for cache_path in (self._get_cache_path('ics'), self._get_ics_body_path()):
+                    if cache_path:
+                        try:
+                            os.remove(cache_path)
+                        except OSError:
+                            pass
 
             # Zeitfenster: 6 Monate in Vergangenheit und Zukunft synchronisieren
             now = datetime.now(timezone.utc)
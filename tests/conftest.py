@@ -27,6 +27,11 @@ import pytest  # noqa: E402
 # Projektverzeichnis zum Python-Pfad hinzufügen
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Projektmodule einmalig vorladen (nach dem Setzen der Umgebungsvariablen),
+# damit die Importkosten nicht im ersten Test anfallen
+import sync_logic  # noqa: E402
+import sync_all_users  # noqa: E402,F401
+
 
 # Fixtures
 
@@ -43,11 +48,21 @@ def setup_test_environment():
         pass  # Ignoriere Fehler beim Aufräumen
 
 
-@pytest.fixture
-def temp_data_dir(tmp_path):
-    """Temporäres DATA_DIR für isolierte Tests."""
-    data_dir = tmp_path / "data"
-    data_dir.mkdir()
+@pytest.fixture(autouse=True)
+def reset_ics_memory_cache():
+    """Leert den prozessweiten ICS-Cache, damit Tests sich nicht beeinflussen."""
+    yield
+    sync_logic._ics_memory_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def temp_data_dir(tmp_path_factory):
+    """Temporäres DATA_DIR, geteilt über die gesamte Test-Session.
+    
+    Alle Tests verwenden eindeutige User-IDs bzw. Dateinamen, daher genügt
+    ein Verzeichnis. pytest behält nur die letzten Basisverzeichnisse.
+    """
+    data_dir = tmp_path_factory.mktemp("data")
     
     # Setze DATA_DIR für diesen Test
     original_data_dir = os.environ.get('DATA_DIR')
@@ -62,6 +77,17 @@ def temp_data_dir(tmp_path):
         os.environ.pop('DATA_DIR', None)
 
 
+@pytest.fixture
+def patched_models(monkeypatch, temp_data_dir):
+    """models-Modul mit DATA_DIR auf temp_data_dir (ohne Modul-Reload)."""
+    import config
+    import models
+    
+    monkeypatch.setattr(config, 'DATA_DIR', str(temp_data_dir))
+    monkeypatch.setattr(models, 'DATA_DIR', str(temp_data_dir))
+    return models
+
+
 @pytest.fixture
 def sample_user_data():
     """Beispiel-Benutzerdaten."""
@@ -154,15 +180,47 @@ def mock_google_service(mocker):
     return mock_service
 
 
+@pytest.fixture
+def no_persist(monkeypatch):
+    """Deaktiviert User.save/User.delete für Tests ohne Persistenz-Bezug."""
+    import models
+    
+    monkeypatch.setattr(models.User, 'save', lambda self: None)
+    monkeypatch.setattr(models.User, 'delete', lambda self: None)
+
+
+@pytest.fixture(scope="session")
+def sync_logic_module():
+    """Das vorgeladene sync_logic-Modul."""
+    return sync_logic
+
+
+@pytest.fixture(scope="session")
+def stub_service():
+    """Platzhalter für den Calendar-Service, wenn der Syncer ihn nur speichert."""
+    class StubService:
+        pass
+    
+    return StubService()
+
+
+@pytest.fixture(scope="class")
+def stateless_syncer(stub_service):
+    """CalendarSyncer ohne User-Kontext für reine Funktionstests."""
+    from sync_logic import CalendarSyncer
+    
+    return CalendarSyncer(stub_service, user_id=None)
+
+
 @pytest.fixture
 def fernet_key():
     """Test-Fernet-Key aus Umgebungsvariable."""
     return os.environ['SECRET_KEY']
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def flask_app():
-    """Flask-App im Testmodus."""
+    """Flask-App im Testmodus (einmal pro Session erzeugt)."""
     # Import hier, da config erst nach setup_test_environment geladen werden sollte
     import config
     config.init()
@@ -179,4 +237,7 @@ def flask_app():
 @pytest.fixture
 def client(flask_app):
     """Flask Test-Client."""
+    # Rate-Limit-Zähler der geteilten App zwischen Tests zurücksetzen
+    for limiter in flask_app.extensions.get('limiter', ()):
+        limiter.reset()
     return flask_app.test_client()
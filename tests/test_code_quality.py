@@ -398,7 +398,6 @@ class TestFlaskApp:
             '/accept',
             '/privacy',
             '/terms',
-            '/health',
             '/favicon.ico',
             '/delete-account',
             '/wipe-target',
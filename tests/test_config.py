@@ -5,14 +5,19 @@ Tests für config.py: Validierung, Verschlüsselung, Konstanten.
 import pytest
 
 
+def _reload_config():
+    """Lädt config neu, damit geänderte Umgebungsvariablen greifen."""
+    import importlib
+    import config
+    return importlib.reload(config)
+
+
 class TestConfigValidation:
     """Konfigurationsvalidierung."""
     
     def test_validate_config_success(self, setup_test_environment):
         """Validierung erfolgreich bei vollständiger Konfiguration."""
-        import importlib
-        import config
-        importlib.reload(config)
+        config = _reload_config()
         
         # Sollte keine Exception werfen
         config.validate_config()
@@ -22,9 +27,7 @@ class TestConfigValidation:
         # Entferne eine erforderliche Variable
         monkeypatch.delenv('GOOGLE_CLIENT_ID', raising=False)
         
-        import importlib
-        import config
-        importlib.reload(config)
+        config = _reload_config()
         
         with pytest.raises(ValueError) as exc_info:
             config.validate_config()
@@ -37,10 +40,7 @@ class TestEncryption:
     
     def test_encrypt_decrypt_roundtrip(self, setup_test_environment):
         """Verschlüsselung und Entschlüsselung sind invertierbar."""
-        import importlib
-        import config
-        importlib.reload(config)
-        config._fernet = None  # Reset cached fernet
+        config = _reload_config()
         
         original_text = "Dies ist ein geheimer Refresh-Token!"
         
@@ -52,10 +52,7 @@ class TestEncryption:
     
     def test_encrypt_produces_different_ciphertext(self, setup_test_environment):
         """Jede Verschlüsselung erzeugt unterschiedlichen Ciphertext (IV)."""
-        import importlib
-        import config
-        importlib.reload(config)
-        config._fernet = None
+        config = _reload_config()
         
         text = "Gleicher Text"
         
@@ -71,10 +68,7 @@ class TestEncryption:
     
     def test_decrypt_invalid_token_fails(self, setup_test_environment):
         """Entschlüsselung ungültiger Tokens wirft Exception."""
-        import importlib
-        import config
-        importlib.reload(config)
-        config._fernet = None
+        config = _reload_config()
         
         with pytest.raises(Exception):  # Fernet wirft InvalidToken
             config.decrypt("ungültiger-token")
@@ -83,9 +77,7 @@ class TestEncryption:
         """Ungültiger SECRET_KEY wirft ValueError."""
         monkeypatch.setenv('SECRET_KEY', 'ungültiger-key')
         
-        import importlib
-        import config
-        importlib.reload(config)
+        config = _reload_config()
         
         with pytest.raises(ValueError) as exc_info:
             config.get_fernet()
@@ -127,6 +119,28 @@ class TestRateLimits:
         
         assert isinstance(config.RATE_LIMIT_DEFAULT, list)
         assert len(config.RATE_LIMIT_DEFAULT) > 0
+    
+    def test_rate_limit_storage_from_env(self, monkeypatch):
+        """RATE_LIMIT_STORAGE_URI ist per Umgebung setzbar, Standard memory://."""
+        monkeypatch.delenv('RATE_LIMIT_STORAGE_URI', raising=False)
+        assert _reload_config().RATE_LIMIT_STORAGE_URI == 'memory://'
+        
+        monkeypatch.setenv('RATE_LIMIT_STORAGE_URI', 'redis://redis:6379/1')
+        assert _reload_config().RATE_LIMIT_STORAGE_URI == 'redis://redis:6379/1'
+        
+        monkeypatch.delenv('RATE_LIMIT_STORAGE_URI')
+        _reload_config()
+    
+    def test_rate_limit_strategy_from_env(self, monkeypatch):
+        """RATE_LIMIT_STRATEGY ist per Umgebung setzbar, Standard fixed-window."""
+        monkeypatch.delenv('RATE_LIMIT_STRATEGY', raising=False)
+        assert _reload_config().RATE_LIMIT_STRATEGY == 'fixed-window'
+        
+        monkeypatch.setenv('RATE_LIMIT_STRATEGY', 'moving-window')
+        assert _reload_config().RATE_LIMIT_STRATEGY == 'moving-window'
+        
+        monkeypatch.delenv('RATE_LIMIT_STRATEGY')
+        _reload_config()
 
 
 class TestAppMetadata:
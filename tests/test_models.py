@@ -8,100 +8,60 @@ import json
 class TestUserCreation:
     """User-Instanziierung."""
     
-    def test_user_creation(self, temp_data_dir, setup_test_environment):
+    def test_user_creation(self, patched_models):
         """User-Objekt wird korrekt initialisiert."""
-        # Reload config mit neuem DATA_DIR
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('test-user-123')
+        user = patched_models.User('test-user-123')
         
         assert user.id == 'test-user-123'
         assert user.data['id'] == 'test-user-123'
     
-    def test_user_get_id(self, temp_data_dir, setup_test_environment):
+    def test_user_get_id(self, patched_models):
         """get_id() liefert String."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('user-456')
+        user = patched_models.User('user-456')
         
         assert user.get_id() == 'user-456'
         assert isinstance(user.get_id(), str)
     
-    def test_user_exists_false_for_new_user(self, temp_data_dir, setup_test_environment):
+    def test_user_exists_false_for_new_user(self, patched_models):
         """exists() liefert False für unbekannte IDs."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        assert models.User.exists('non-existent-user') is False
+        assert patched_models.User.exists('non-existent-user') is False
     
-    def test_user_exists_true_after_save(self, temp_data_dir, setup_test_environment):
+    def test_user_exists_true_after_save(self, patched_models):
         """exists() liefert True nach save()."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('saved-user')
+        user = patched_models.User('saved-user')
         user.save()
         
-        assert models.User.exists('saved-user') is True
+        assert patched_models.User.exists('saved-user') is True
 
 
 class TestUserPersistence:
     """Datenpersistierung."""
     
-    def test_user_save_creates_file(self, temp_data_dir, setup_test_environment):
+    def test_user_save_creates_file(self, patched_models, temp_data_dir):
         """save() erstellt JSON-Datei."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('persist-user')
+        user = patched_models.User('persist-user')
         user.data['email'] = 'test@example.com'
         user.save()
         
         expected_file = temp_data_dir / 'persist-user.json'
         assert expected_file.exists()
         
-        with open(expected_file) as f:
-            saved_data = json.load(f)
+        saved_data = json.loads(expected_file.read_bytes())
         
         assert saved_data['email'] == 'test@example.com'
     
-    def test_user_load_existing_data(self, temp_data_dir, setup_test_environment):
-        """Bestehende Daten werden geladen."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
+    def test_user_save_leaves_no_temp_file(self, patched_models, temp_data_dir):
+        """save() schreibt atomar und räumt die temporäre Datei weg."""
+        user = patched_models.User('atomic-user')
+        user.save()
+        user.data['email'] = 'neu@example.com'
+        user.save()
         
+        assert not list(temp_data_dir.glob('*.tmp'))
+        assert json.loads((temp_data_dir / 'atomic-user.json').read_bytes())['email'] == 'neu@example.com'
+    
+    def test_user_load_existing_data(self, patched_models, temp_data_dir):
+        """Bestehende Daten werden geladen."""
         # Erstelle Datei manuell
         user_file = temp_data_dir / 'load-test.json'
         test_data = {
@@ -109,11 +69,10 @@ class TestUserPersistence:
             'email': 'existing@example.com',
             'source_id': 'https://example.com/cal.ics'
         }
-        with open(user_file, 'w') as f:
-            json.dump(test_data, f)
+        user_file.write_text(json.dumps(test_data))
         
         # Lade User
-        user = models.User('load-test')
+        user = patched_models.User('load-test')
         
         assert user.data['email'] == 'existing@example.com'
         assert user.data['source_id'] == 'https://example.com/cal.ics'
@@ -122,17 +81,9 @@ class TestUserPersistence:
 class TestUserConfig:
     """Benutzerkonfiguration."""
     
-    def test_get_config_defaults(self, temp_data_dir, setup_test_environment):
-        """get_config() liefert Standardwerte."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('config-test')
+    def test_config_roundtrip(self, patched_models, no_persist):
+        """get_config() liefert Standardwerte, set_config() überschreibt sie."""
+        user = patched_models.User('config-test')
         cfg = user.get_config()
         
         assert cfg['email'] == ''
@@ -140,18 +91,7 @@ class TestUserConfig:
         assert cfg['target_id'] == ''
         assert cfg['regex_patterns'] == []
         assert cfg['source_timezone'] == 'Europe/Berlin'
-    
-    def test_set_config(self, temp_data_dir, setup_test_environment):
-        """set_config() speichert Werte."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
         
-        user = models.User('config-set-test')
         user.set_config(
             source_id='https://dhbw.de/calendar.ics',
             target_id='target-cal-id',
@@ -170,51 +110,112 @@ class TestUserConfig:
 class TestUserAuth:
     """Authentifizierungsdaten."""
     
-    def test_set_auth(self, temp_data_dir, setup_test_environment):
+    def test_set_auth(self, patched_models, no_persist):
         """set_auth() speichert E-Mail und Token."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('auth-test')
+        user = patched_models.User('auth-test')
         user.set_auth('user@example.com', 'encrypted-token-123')
         
         assert user.data['email'] == 'user@example.com'
         assert user.data['refresh_token_encrypted'] == 'encrypted-token-123'
+    
+    def test_get_credentials_reuses_valid_token(self, patched_models, no_persist, monkeypatch):
+        """get_credentials() frischt gültige Credentials nicht erneut auf und entschlüsselt nur einmal."""
+        from datetime import datetime, timedelta, timezone
+        
+        refresh_calls = []
+        
+        def fake_refresh(creds, request):
+            refresh_calls.append(request)
+            creds.token = 'access-token'
+            creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+        
+        monkeypatch.setattr(patched_models.Credentials, 'refresh', fake_refresh)
+        decrypt_calls = []
+        
+        def fake_decrypt(token):
+            decrypt_calls.append(token)
+            return token
+        
+        monkeypatch.setattr(patched_models, 'decrypt', fake_decrypt)
+        
+        user = patched_models.User('creds-cache-test')
+        user.set_auth('creds@example.com', 'refresh-token')
+        
+        first = user.get_credentials()
+        second = user.get_credentials()
+        
+        assert second is first
+        assert len(refresh_calls) == 1
+        assert len(decrypt_calls) == 1
+        patched_models.invalidate_credentials(user.id)
+    
+    def test_refresh_expiring_credentials_only_near_expiry(self, patched_models, monkeypatch):
+        """Bald ablaufende Credentials werden als Kopie aufgefrischt, ungenutzte verworfen."""
+        import time
+        from datetime import datetime, timedelta, timezone
+        from unittest.mock import MagicMock
+        
+        refreshed_tokens = []
+        
+        def fake_refresh(creds, request):
+            refreshed_tokens.append(creds.refresh_token)
+            creds.token = 'new-access-token'
+            creds.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+        
+        monkeypatch.setattr(patched_models.Credentials, 'refresh', fake_refresh)
+        
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        recently = time.monotonic()
+        expiring = MagicMock(expiry=now + timedelta(minutes=2), refresh_token='refresh-a')
+        fresh = MagicMock(expiry=now + timedelta(hours=1), refresh_token='refresh-b')
+        idle = MagicMock(expiry=now + timedelta(minutes=2), refresh_token='refresh-c')
+        cache = {
+            'expiring': ('token-a', expiring, recently),
+            'fresh': ('token-b', fresh, recently),
+            'idle': ('token-c', idle, recently - patched_models.TOKEN_PREFETCH_IDLE - 1),
+        }
+        monkeypatch.setattr(patched_models, '_credentials_cache', cache)
+        
+        assert patched_models.refresh_expiring_credentials() == 1
+        assert refreshed_tokens == ['refresh-a']
+        # Objekt der Request-Threads bleibt unverändert, die Kopie wird eingesetzt
+        expiring.refresh.assert_not_called()
+        assert cache['expiring'][1] is not expiring
+        assert cache['expiring'][1].token == 'new-access-token'
+        assert cache['fresh'][1] is fresh
+        assert 'idle' not in cache
+    
+    def test_cert_caching_request_honors_max_age(self, patched_models):
+        """Zertifikate werden gemäß Cache-Control max-age wiederverwendet."""
+        from types import SimpleNamespace
+        
+        calls = []
+        
+        def fake_request(url, method='GET', body=None, headers=None, **kwargs):
+            calls.append((url, method))
+            return SimpleNamespace(status=200, headers={'Cache-Control': 'public, max-age=300'}, data=b'{}')
+        
+        request = patched_models.CertCachingRequest(fake_request)
+        first = request('https://certs.example.com')
+        second = request('https://certs.example.com')
+        request('https://token.example.com', method='POST', body=b'x')
+        
+        assert second is first
+        assert calls == [('https://certs.example.com', 'GET'), ('https://token.example.com', 'POST')]
 
 
 class TestUserDisclaimer:
     """Disclaimer-Status."""
     
-    def test_disclaimer_default_false(self, temp_data_dir, setup_test_environment):
+    def test_disclaimer_default_false(self, patched_models, no_persist):
         """Disclaimer ist standardmäßig nicht akzeptiert."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('disclaimer-test')
+        user = patched_models.User('disclaimer-test')
         
         assert user.has_accepted_disclaimer() is False
     
-    def test_set_disclaimer_accepted(self, temp_data_dir, setup_test_environment):
+    def test_set_disclaimer_accepted(self, patched_models, no_persist):
         """set_disclaimer_accepted() markiert als akzeptiert."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('disclaimer-accept-test')
+        user = patched_models.User('disclaimer-accept-test')
         user.set_disclaimer_accepted()
         
         assert user.has_accepted_disclaimer() is True
@@ -223,17 +224,9 @@ class TestUserDisclaimer:
 class TestUserDeletion:
     """Account-Löschung."""
     
-    def test_delete_removes_config_file(self, temp_data_dir, setup_test_environment):
+    def test_delete_removes_config_file(self, patched_models, temp_data_dir):
         """delete() entfernt Konfigurationsdatei."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('delete-test')
+        user = patched_models.User('delete-test')
         user.save()
         
         config_file = temp_data_dir / 'delete-test.json'
@@ -243,17 +236,9 @@ class TestUserDeletion:
         
         assert not config_file.exists()
     
-    def test_delete_removes_log_file(self, temp_data_dir, setup_test_environment):
+    def test_delete_removes_log_file(self, patched_models, temp_data_dir):
         """delete() entfernt Log-Datei."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('delete-log-test')
+        user = patched_models.User('delete-log-test')
         user.save()
         
         # Erstelle Log-Datei
@@ -264,69 +249,82 @@ class TestUserDeletion:
         
         assert not log_file.exists()
     
-    def test_delete_removes_cache_files(self, temp_data_dir, setup_test_environment):
+    def test_delete_removes_cache_files(self, patched_models, temp_data_dir):
         """delete() entfernt Cache-Dateien."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
-        user = models.User('delete-cache-test')
+        user = patched_models.User('delete-cache-test')
         user.save()
         
         # Erstelle Cache-Verzeichnis und Dateien
         cache_dir = temp_data_dir / '.cache'
-        cache_dir.mkdir()
+        cache_dir.mkdir(exist_ok=True)
         
         ics_cache = cache_dir / 'delete-cache-test_ics.json'
         events_cache = cache_dir / 'delete-cache-test_events.json'
+        ics_body = cache_dir / 'delete-cache-test_ics.ics'
         
-        ics_cache.write_text('{}')
-        events_cache.write_text('{}')
+        ics_cache.write_bytes(b'{}')
+        events_cache.write_bytes(b'{}')
+        ics_body.write_bytes(b'BEGIN:VCALENDAR')
         
         user.delete()
         
         assert not ics_cache.exists()
         assert not events_cache.exists()
+        assert not ics_body.exists()
 
 
 class TestUserStaticMethods:
     """Statische Methoden."""
     
-    def test_load_existing_user(self, temp_data_dir, setup_test_environment):
+    def test_load_existing_user(self, patched_models):
         """load() lädt existierenden User."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
-        
-        import models
-        importlib.reload(models)
-        
         # Erstelle User
-        original = models.User('load-static-test')
+        original = patched_models.User('load-static-test')
         original.data['email'] = 'static@test.com'
         original.save()
         
         # Lade mit statischer Methode
-        loaded = models.User.load('load-static-test')
+        loaded = patched_models.User.load('load-static-test')
         
         assert loaded is not None
         assert loaded.data['email'] == 'static@test.com'
     
-    def test_load_non_existing_user(self, temp_data_dir, setup_test_environment):
+    def test_load_non_existing_user(self, patched_models):
         """load() gibt None für unbekannte IDs zurück."""
-        import importlib
-        import config
-        config.DATA_DIR = str(temp_data_dir)
-        importlib.reload(config)
+        loaded = patched_models.User.load('non-existent-user')
         
-        import models
-        importlib.reload(models)
+        assert loaded is None
+    
+    def test_get_cached_reuses_until_file_changes(self, patched_models):
+        """get_cached() liefert die gecachten Daten, bis die Datei neu geschrieben wird."""
+        user = patched_models.User('cached-user-test')
+        user.data['email'] = 'cached@test.com'
+        user.save()
         
-        loaded = models.User.load('non-existent-user')
+        cached = patched_models.User.get_cached('cached-user-test')
+        assert cached is not user
+        assert cached.data == user.data
         
-        assert loaded is None
+        other = patched_models.User('cached-user-test')
+        other.data['email'] = 'changed@test.com'
+        other.save()
+        
+        assert patched_models.User.get_cached('cached-user-test').data['email'] == 'changed@test.com'
+    
+    def test_get_cached_ignores_unsaved_changes(self, patched_models, monkeypatch):
+        """Änderungen an einem User ohne erfolgreiches save() erreichen andere Requests nicht."""
+        import pytest
+        
+        def failing_replace(src, dst):
+            raise OSError("Datenträger voll")
+        
+        user = patched_models.User('cached-dirty-test')
+        user.data['target_id'] = 'alt'
+        user.save()
+        
+        loaded = patched_models.User.get_cached('cached-dirty-test')
+        monkeypatch.setattr(patched_models.os, 'replace', failing_replace)
+        with pytest.raises(OSError):
+            loaded.set_config('quelle', 'neu', [], 'Europe/Berlin')
+        
+        assert patched_models.User.get_cached('cached-dirty-test').data['target_id'] == 'alt'
@@ -2,21 +2,55 @@
 Erweiterte Tests für sync_logic.py und sync_all_users.py.
 """
 
-from unittest.mock import MagicMock
+from types import SimpleNamespace
+
+import arrow
+import pytest
+
+
+# Filtermuster als Modul-Konstanten (einmal definiert, von filter_events gecacht)
+_PATTERNS_TEST = ['Test']
+_PATTERNS_PAREN = [r'\(1\)']
+
+# Event-Vorlagen; Tests erzeugen Varianten per {**_EMPTY_EVENT, ...}
+_EMPTY_EVENT = {'summary': '', 'description': '', 'location': '', 'start': {}, 'end': {}}
+_ALL_DAY_EVENT = {
+    **_EMPTY_EVENT,
+    'summary': 'Event',
+    'start': {'date': '2026-01-21'},
+    'end': {'date': '2026-01-22'},
+}
+
+# Zeitpunkte für ICS-Standardisierung (einmal geparst)
+_DAY_2026_10_03 = arrow.get('2026-10-03')
+_DAY_2026_01_21 = arrow.get('2026-01-21')
+_LECTURE_START = arrow.get('2026-01-21T09:00:00+01:00')
+_LECTURE_END = arrow.get('2026-01-21T10:30:00+01:00')
 
 
 class TestSyncAllUsersModule:
     """sync_all_users.py Funktionen."""
     
-    def test_log_function_format(self, setup_test_environment, capsys):
+    def test_log_function_format(self, setup_test_environment):
         """log() formatiert mit Timestamp."""
         from sync_all_users import log
         
-        log("Test Message")
+        captured = []
+        log("Test Message", writer=captured.append)
         
-        captured = capsys.readouterr()
-        assert "SYNC: Test Message" in captured.out
-        assert "[" in captured.out  # Timestamp vorhanden
+        assert "SYNC: Test Message" in captured[0]
+        assert captured[0].startswith("[")  # Timestamp vorhanden
+    
+    def test_log_timestamp_matches_isoformat(self, setup_test_environment):
+        """log_timestamp() liefert denselben Aufbau wie datetime.isoformat()."""
+        from datetime import datetime
+        from sync_all_users import log_timestamp
+        
+        before = datetime.now().replace(microsecond=0)
+        parsed = datetime.fromisoformat(log_timestamp())
+        
+        assert before <= parsed.replace(microsecond=0) <= datetime.now()
+        assert len(log_timestamp()) == len("2026-01-21T09:00:00.000000")
     
     def test_build_credentials_no_token(self, setup_test_environment):
         """build_credentials() gibt None ohne Token zurück."""
@@ -28,6 +62,16 @@ class TestSyncAllUsersModule:
         
         assert result is None
     
+    def test_build_credentials_logs_to_given_log_func(self, setup_test_environment, capsys):
+        """build_credentials() meldet Fehler über log_func statt auf stdout."""
+        from sync_all_users import build_credentials
+        
+        messages = []
+        build_credentials({'email': 'test@example.com'}, log_func=messages.append)
+        
+        assert "keinen Refresh-Token" in messages[0]
+        assert capsys.readouterr().out == ''
+    
     def test_build_credentials_invalid_token(self, setup_test_environment):
         """build_credentials() gibt None bei ungültigem Token zurück."""
         from sync_all_users import build_credentials
@@ -40,94 +84,95 @@ class TestSyncAllUsersModule:
         result = build_credentials(user_data)
         
         assert result is None
+    
+    def test_run_for_user_missing_config(self, setup_test_environment):
+        """run_for_user() meldet fehlende Konfiguration über log_func."""
+        from sync_all_users import run_for_user
+        
+        messages = []
+        run_for_user('does-not-exist', log_func=messages.append)
+        
+        assert any('nicht gefunden' in m for m in messages)
 
 
 class TestCalendarSyncerInit:
     """CalendarSyncer-Initialisierung."""
     
-    def test_syncer_creates_cache_dir(self, temp_data_dir, setup_test_environment):
+    def test_syncer_creates_cache_dir(self, temp_data_dir, sync_logic_module, monkeypatch, stub_service):
         """CalendarSyncer erstellt Cache-Verzeichnis."""
-        from sync_logic import CalendarSyncer
-        import sync_logic
+        # Eigenes Verzeichnis, da .cache von anderen Tests angelegt sein kann
+        cache_dir = temp_data_dir / '.cache-init'
+        monkeypatch.setattr(sync_logic_module, 'CACHE_DIR', str(cache_dir))
         
-        cache_dir = temp_data_dir / '.cache'
-        sync_logic.CACHE_DIR = str(cache_dir)
-        
-        mock_service = MagicMock()
-        CalendarSyncer(mock_service, user_id='test-user')
+        sync_logic_module.CalendarSyncer(stub_service, user_id='test-user')
         
         assert cache_dir.exists()
     
-    def test_syncer_custom_log_callback(self, setup_test_environment):
+    def test_syncer_custom_log_callback(self, sync_logic_module, stub_service):
         """CalendarSyncer unterstützt custom log callback."""
-        from sync_logic import CalendarSyncer
-        
         log_messages = []
         
         def custom_logger(msg):
             log_messages.append(msg)
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, log_callback=custom_logger)
+        syncer = sync_logic_module.CalendarSyncer(stub_service, log_callback=custom_logger)
         
         syncer.log("Test Message")
         
         assert "Test Message" in log_messages
+    
+    def test_build_calendar_service_shares_discovery_doc(self, sync_logic_module):
+        """Das Discovery-Dokument wird nur einmal geladen, Services bleiben getrennt."""
+        from google.oauth2.credentials import Credentials
+        
+        first = sync_logic_module.build_calendar_service(Credentials(token='a'))
+        second = sync_logic_module.build_calendar_service(Credentials(token='b'))
+        
+        assert first is not second
+        assert sync_logic_module._calendar_discovery_doc.cache_info().currsize == 1
+        assert 'calendar/v3' in first.events().list(calendarId='primary').uri
 
 
 class TestCacheFunctions:
     """Cache-Hilfsfunktionen."""
     
-    def test_get_cache_path_with_user_id(self, temp_data_dir, setup_test_environment):
+    def test_get_cache_path_with_user_id(self, temp_data_dir, sync_logic_module, monkeypatch, stub_service):
         """_get_cache_path() liefert korrekten Pfad."""
-        from sync_logic import CalendarSyncer
-        import sync_logic
-        
-        sync_logic.CACHE_DIR = str(temp_data_dir / '.cache')
+        monkeypatch.setattr(sync_logic_module, 'CACHE_DIR', str(temp_data_dir / '.cache'))
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='cache-user-123')
+        syncer = sync_logic_module.CalendarSyncer(stub_service, user_id='cache-user-123')
         
         path = syncer._get_cache_path('events')
         
         assert 'cache-user-123_events.json' in path
     
-    def test_get_cache_path_without_user_id(self, setup_test_environment):
+    def test_get_cache_path_without_user_id(self, sync_logic_module, stub_service):
         """_get_cache_path() gibt None ohne user_id zurück."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id=None)
+        syncer = sync_logic_module.CalendarSyncer(stub_service, user_id=None)
         
         path = syncer._get_cache_path('events')
         
         assert path is None
     
-    def test_save_cache_without_user_id(self, setup_test_environment):
+    def test_save_cache_without_user_id(self, sync_logic_module, stub_service):
         """_save_cache() ohne user_id ist no-op."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id=None)
+        syncer = sync_logic_module.CalendarSyncer(stub_service, user_id=None)
         
         # Sollte keine Exception werfen
         syncer._save_cache('events', {'test': 'data'})
     
-    def test_clear_cache(self, temp_data_dir, setup_test_environment):
+    def test_clear_cache(self, temp_data_dir, sync_logic_module, monkeypatch, stub_service):
         """clear_cache() löscht Cache-Dateien."""
-        from sync_logic import CalendarSyncer
-        import sync_logic
-        
         cache_dir = temp_data_dir / '.cache'
         cache_dir.mkdir(exist_ok=True)
-        sync_logic.CACHE_DIR = str(cache_dir)
+        monkeypatch.setattr(sync_logic_module, 'CACHE_DIR', str(cache_dir))
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='clear-cache-user')
+        syncer = sync_logic_module.CalendarSyncer(stub_service, user_id='clear-cache-user')
         
         # Erstelle Cache-Dateien
-        syncer._save_cache('ics', {'etag': 'test'})
-        syncer._save_cache('events', {'events': []})
+        (cache_dir / 'clear-cache-user_ics.json').write_bytes(b'{"etag": "test"}')
+        (cache_dir / 'clear-cache-user_events.json').write_bytes(b'{"events": []}')
+        (cache_dir / 'clear-cache-user_ics.ics').write_bytes(b'BEGIN:VCALENDAR')
         
         # Lösche Cache
         syncer.clear_cache()
@@ -135,258 +180,193 @@ class TestCacheFunctions:
         # Verifiziere dass Caches leer sind
         assert syncer._load_cache('ics') == {}
         assert syncer._load_cache('events') == {}
+        assert syncer._load_ics_body() is None
 
 
-class TestEventHashing:
-    """Event-Hashing."""
+class TestDeltaSyncWithOldHashes:
+    """Delta-Sync mit Event-Cache aus einem älteren Hash-Format."""
     
-    def test_hash_includes_description(self, setup_test_environment):
-        """Hash berücksichtigt Beschreibung."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        event1 = {
-            'summary': 'Event',
-            'description': 'Description A',
-            'location': '',
-            'start': {'date': '2026-01-21'},
-            'end': {'date': '2026-01-22'},
-        }
+    def test_old_hashes_rewrite_via_update_path_without_target_scan(self, temp_data_dir, sync_logic_module,
+                                                                    monkeypatch, stub_service):
+        """Alte Hashes bei gleichen Keys: je Event ein Delete + Create, kein Scan des Zielkalenders."""
+        import json
         
-        event2 = {
-            'summary': 'Event',
-            'description': 'Description B',
-            'location': '',
-            'start': {'date': '2026-01-21'},
-            'end': {'date': '2026-01-22'},
-        }
+        cache_dir = temp_data_dir / '.cache'
+        cache_dir.mkdir(exist_ok=True)
+        monkeypatch.setattr(sync_logic_module, 'CACHE_DIR', str(cache_dir))
+        syncer = sync_logic_module.CalendarSyncer(stub_service, user_id='old-hash-user')
         
-        assert syncer._compute_event_hash(event1) != syncer._compute_event_hash(event2)
+        events = [
+            {
+                'uid': f'vorlesung-{i}@dhbw.de',
+                'summary': f'Vorlesung {i}',
+                'start': {'dateTime': f'2026-01-2{i}T09:00:00+01:00'},
+                'end': {'dateTime': f'2026-01-2{i}T10:30:00+01:00'},
+            }
+            for i in range(3)
+        ]
+        keys = [syncer._get_event_key(event) for event in events]
+        # Cache im alten Format: md5-Hashes, kein hash_version-Feld
+        (cache_dir / 'old-hash-user_events.json').write_text(json.dumps({
+            'hashes': {key: '0' * 32 for key in keys},
+            'event_ids': {key: f'id{i}' for i, key in enumerate(keys)},
+            'target_id': 'target',
+            'source_id': 'https://example.com/cal.ics',
+        }))
+        
+        deleted_ids = []
+        
+        def fake_delete(calendar_id, event_ids, max_attempts=3):
+            deleted_ids.extend(event_ids)
+            return len(event_ids)
+        
+        def fail_target_scan(*args, **kwargs):
+            raise AssertionError("Zielkalender darf nicht gescannt werden")
+        
+        monkeypatch.setattr(syncer, '_batch_delete_events', fake_delete)
+        monkeypatch.setattr(syncer, '_batch_create_events',
+                            lambda calendar_id, new_events, max_attempts=3: [f'new{i}' for i in range(len(new_events))])
+        monkeypatch.setattr(syncer, '_initialize_cache_from_target', fail_target_scan)
+        
+        result = syncer.sync_to_target('target', events, source_id='https://example.com/cal.ics')
+        
+        assert result == (3, 3)
+        assert sorted(deleted_ids) == ['id0', 'id1', 'id2']
+        # Zweiter Lauf mit den neuen Hashes: nichts mehr zu tun
+        assert syncer.sync_to_target('target', events, source_id='https://example.com/cal.ics') == (0, 0)
+
+
+class TestEventHashing:
+    """Event-Hashing."""
     
-    def test_hash_includes_location(self, setup_test_environment):
-        """Hash berücksichtigt Location."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        event1 = {
-            'summary': 'Event',
-            'description': '',
-            'location': 'Room A',
-            'start': {'date': '2026-01-21'},
-            'end': {'date': '2026-01-22'},
-        }
-        
-        event2 = {
-            'summary': 'Event',
-            'description': '',
-            'location': 'Room B',
-            'start': {'date': '2026-01-21'},
-            'end': {'date': '2026-01-22'},
-        }
-        
-        assert syncer._compute_event_hash(event1) != syncer._compute_event_hash(event2)
+    @pytest.mark.parametrize("field", ['description', 'location'])
+    def test_hash_includes_field(self, stateless_syncer, field):
+        """Hash berücksichtigt Beschreibung und Location."""
+        event1 = {**_ALL_DAY_EVENT, field: 'A'}
+        event2 = {**_ALL_DAY_EVENT, field: 'B'}
+        
+        hash1 = stateless_syncer._compute_event_hash(event1)
+        hash2 = stateless_syncer._compute_event_hash(event2)
+        assert hash1 != hash2
 
 
 class TestEventKey:
     """Event-Key-Generierung."""
     
-    def test_event_key_with_datetime(self, setup_test_environment):
-        """Event-Key verwendet dateTime."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        event = {
+    @pytest.mark.parametrize("event,expected", [
+        # dateTime für zeitgebundene Events
+        ({
             'summary': 'Vorlesung',
             'start': {'dateTime': '2026-01-21T09:00:00+01:00'},
             'end': {'dateTime': '2026-01-21T10:00:00+01:00'},
-        }
-        
-        key = syncer._get_event_key(event)
-        
-        assert '2026-01-21T09:00:00+01:00' in key
-        assert 'Vorlesung' in key
-    
-    def test_event_key_with_date(self, setup_test_environment):
-        """Event-Key verwendet date für Ganztags-Events."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        event = {
+        }, ['2026-01-21T09:00:00+01:00', 'Vorlesung']),
+        # date für Ganztags-Events
+        ({
             'summary': 'Feiertag',
             'start': {'date': '2026-10-03'},
             'end': {'date': '2026-10-04'},
-        }
-        
-        key = syncer._get_event_key(event)
-        
-        assert '2026-10-03' in key
-        assert 'Feiertag' in key
-    
-    def test_event_key_missing_start(self, setup_test_environment):
-        """Event-Key ohne Start verwendet leeren String."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        event = {
-            'summary': 'Broken Event',
-        }
-        
-        key = syncer._get_event_key(event)
-        
-        assert '|Broken Event' in key
+        }, ['2026-10-03', 'Feiertag']),
+        # Ohne Start wird ein leerer String verwendet
+        ({'summary': 'Broken Event'}, ['|Broken Event']),
+    ], ids=['datetime', 'date', 'missing-start'])
+    def test_event_key(self, stateless_syncer, event, expected):
+        """Event-Key enthält Startzeit und Titel."""
+        key = stateless_syncer._get_event_key(event)
+        
+        for part in expected:
+            assert part in key
 
 
 class TestICSStandardization:
     """ICS-Event-Standardisierung."""
     
-    def test_standardize_ics_all_day_event(self, setup_test_environment):
-        """Ganztags-Events werden korrekt standardisiert."""
-        from sync_logic import CalendarSyncer
-        import arrow
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        # Mock ICS Event
-        ics_event = MagicMock()
-        ics_event.name = 'Feiertag'
-        ics_event.description = 'Gesetzlicher Feiertag'
-        ics_event.location = ''
-        ics_event.all_day = True
-        ics_event.begin = arrow.get('2026-10-03')
-        ics_event.end = arrow.get('2026-10-03')
-        
-        result = syncer.standardize_event(ics_event, 'ics')
-        
-        assert result['summary'] == 'Feiertag'
-        assert 'date' in result['start']
-        assert result['start']['date'] == '2026-10-03'
-    
-    def test_standardize_ics_timed_event(self, setup_test_environment):
-        """Zeitgebundene Events werden korrekt standardisiert."""
-        from sync_logic import CalendarSyncer
-        import arrow
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        # Mock ICS Event
-        ics_event = MagicMock()
-        ics_event.name = 'Vorlesung'
-        ics_event.description = 'Mathematik'
-        ics_event.location = 'Raum A101'
-        ics_event.all_day = False
-        ics_event.begin = arrow.get('2026-01-21T09:00:00+01:00')
-        ics_event.end = arrow.get('2026-01-21T10:30:00+01:00')
-        
-        result = syncer.standardize_event(ics_event, 'ics')
-        
-        assert result['summary'] == 'Vorlesung'
-        assert result['location'] == 'Raum A101'
-        assert 'dateTime' in result['start']
-    
-    def test_standardize_ics_missing_fields(self, setup_test_environment):
-        """Fehlende Felder erhalten Standardwerte."""
-        from sync_logic import CalendarSyncer
-        import arrow
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
-        # Mock ICS Event ohne optionale Felder
-        ics_event = MagicMock()
-        ics_event.name = None
-        ics_event.description = None
-        ics_event.location = None
-        ics_event.all_day = True
-        ics_event.begin = arrow.get('2026-01-21')
-        ics_event.end = arrow.get('2026-01-21')
-        
-        result = syncer.standardize_event(ics_event, 'ics')
-        
-        assert result['summary'] == 'Kein Titel'
-        assert result['description'] == ''
-        assert result['location'] == ''
+    @pytest.mark.parametrize("attrs, expected", [
+        # Ganztags-Event
+        (dict(name='Feiertag', description='Gesetzlicher Feiertag', location='', all_day=True,
+              begin=_DAY_2026_10_03, end=_DAY_2026_10_03),
+         dict(summary='Feiertag', start={'date': '2026-10-03'})),
+        # Zeitgebundenes Event
+        (dict(name='Vorlesung', description='Mathematik', location='Raum A101', all_day=False,
+              begin=_LECTURE_START, end=_LECTURE_END),
+         dict(summary='Vorlesung', location='Raum A101', start={'dateTime': _LECTURE_START.isoformat()})),
+        # Fehlende Felder erhalten Standardwerte
+        (dict(name=None, description=None, location=None, all_day=True,
+              begin=_DAY_2026_01_21, end=_DAY_2026_01_21),
+         dict(summary='Kein Titel', description='', location='')),
+    ], ids=['all_day', 'timed', 'missing_fields'])
+    def test_standardize_ics_event(self, stateless_syncer, attrs, expected):
+        """ICS-Events werden korrekt standardisiert."""
+        result = stateless_syncer.standardize_event(SimpleNamespace(**attrs), 'ics')
+        
+        assert {k: result[k] for k in expected} == expected
 
 
 class TestFilterEdgeCases:
     """Filter-Randfälle."""
     
-    def test_filter_empty_summary(self, setup_test_environment):
+    def test_filter_empty_summary(self, stateless_syncer):
         """Events ohne Summary werden nicht gefiltert."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
         events = [
-            {'summary': '', 'description': '', 'location': '', 'start': {}, 'end': {}},
+            _EMPTY_EVENT,
         ]
         
-        filtered, excluded = syncer.filter_events(events, ['Test'])
+        filtered, excluded = stateless_syncer.filter_events(events, _PATTERNS_TEST)
         
         assert len(filtered) == 1
         assert excluded == 0
     
-    def test_filter_special_characters_in_pattern(self, setup_test_environment):
+    def test_filter_special_characters_in_pattern(self, stateless_syncer):
         """Regex mit Sonderzeichen funktioniert."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
         events = [
-            {'summary': 'Event (1)', 'description': '', 'location': '', 'start': {}, 'end': {}},
-            {'summary': 'Event [2]', 'description': '', 'location': '', 'start': {}, 'end': {}},
+            {**_EMPTY_EVENT, 'summary': 'Event (1)'},
+            {**_EMPTY_EVENT, 'summary': 'Event [2]'},
         ]
         
         # Regex das (1) matched
-        filtered, excluded = syncer.filter_events(events, [r'\(1\)'])
+        filtered, excluded = stateless_syncer.filter_events(events, _PATTERNS_PAREN)
         
         assert len(filtered) == 1
         assert filtered[0]['summary'] == 'Event [2]'
+    
+    def test_filter_multiple_patterns_with_backreference(self, stateless_syncer):
+        """Mehrere Muster mit Rückverweis werden weiterhin einzeln korrekt geprüft."""
+        events = [
+            {**_EMPTY_EVENT, 'summary': 'Test'},
+            {**_EMPTY_EVENT, 'summary': 'Kurs aa'},
+            {**_EMPTY_EVENT, 'summary': 'Kurs ab'},
+        ]
+        
+        filtered, excluded = stateless_syncer.filter_events(events, ['^Test$', r'(\w)\1$'])
+        
+        assert [e['summary'] for e in filtered] == ['Kurs ab']
+        assert excluded == 2
 
 
 class TestLogErrorHandling:
     """Logging-Fehlerbehandlung."""
     
-    def test_log_to_invalid_path(self, setup_test_environment, capsys):
+    def test_log_to_invalid_path(self, setup_test_environment, stub_service):
         """Ungültiger Pfad crasht nicht."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
+        messages = []
         syncer = CalendarSyncer(
-            mock_service, 
+            stub_service, 
+            log_callback=messages.append,
             user_log_file='/invalid/path/that/does/not/exist/log.log'
         )
         
         # Sollte keine Exception werfen
         syncer.log("Test", user_message="Test User Message")
         
-        captured = capsys.readouterr()
-        assert "LOG-FEHLER" in captured.out
+        assert any("LOG-FEHLER" in m for m in messages)
 
 
 class TestGoogleEventStandardization:
     """Google-Event-Standardisierung."""
     
-    def test_standardize_google_event_with_all_fields(self, setup_test_environment):
+    def test_standardize_google_event_with_all_fields(self, stateless_syncer):
         """Alle Felder werden korrekt übernommen."""
-        from sync_logic import CalendarSyncer
-        
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
-        
         google_event = {
             'summary': 'Meeting',
             'description': 'Wichtiges Meeting',
@@ -397,7 +377,7 @@ class TestGoogleEventStandardization:
             'created': '2026-01-01T00:00:00Z',
         }
         
-        result = syncer.standardize_event(google_event, 'google')
+        result = stateless_syncer.standardize_event(google_event, 'google')
         
         assert result['summary'] == 'Meeting'
         assert result['description'] == 'Wichtiges Meeting'
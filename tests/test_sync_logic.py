@@ -3,19 +3,17 @@ Tests für sync_logic.py: Filterung, Standardisierung, Caching.
 """
 
 import os
-from unittest.mock import MagicMock
 import responses
 
 
 class TestEventStandardization:
     """Event-Normalisierung."""
     
-    def test_standardize_google_event(self, setup_test_environment):
+    def test_standardize_google_event(self, setup_test_environment, stub_service):
         """Google-Events werden korrekt standardisiert."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         google_event = {
             'summary': 'Test Event',
@@ -33,12 +31,11 @@ class TestEventStandardization:
         assert result['start'] == google_event['start']
         assert result['end'] == google_event['end']
     
-    def test_standardize_google_event_missing_fields(self, setup_test_environment):
+    def test_standardize_google_event_missing_fields(self, setup_test_environment, stub_service):
         """Fehlende Felder erhalten Standardwerte."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         minimal_event = {
             'start': {'date': '2026-01-21'},
@@ -55,24 +52,22 @@ class TestEventStandardization:
 class TestEventFiltering:
     """Regex-Filterung."""
     
-    def test_filter_events_no_patterns(self, sample_events, setup_test_environment):
+    def test_filter_events_no_patterns(self, sample_events, setup_test_environment, stub_service):
         """Ohne Patterns bleiben alle Events erhalten."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         filtered, excluded_count = syncer.filter_events(sample_events, [])
         
         assert len(filtered) == len(sample_events)
         assert excluded_count == 0
     
-    def test_filter_events_with_pattern(self, sample_events, setup_test_environment):
+    def test_filter_events_with_pattern(self, sample_events, setup_test_environment, stub_service):
         """Passende Titel werden gefiltert."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         # Filter: Feiertage ausschließen
         filtered, excluded_count = syncer.filter_events(sample_events, [r'^Feiertag:'])
@@ -81,12 +76,11 @@ class TestEventFiltering:
         assert len(filtered) == 3
         assert all('Feiertag' not in e['summary'] for e in filtered)
     
-    def test_filter_events_multiple_patterns(self, sample_events, setup_test_environment):
+    def test_filter_events_multiple_patterns(self, sample_events, setup_test_environment, stub_service):
         """Mehrere Patterns werden kombiniert."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         # Filter: Feiertage UND Abgesagte ausschließen
         patterns = [r'^Feiertag:', r'Abgesagt']
@@ -97,12 +91,11 @@ class TestEventFiltering:
         assert 'Vorlesung Mathematik' in [e['summary'] for e in filtered]
         assert 'Klausur Datenbanken' in [e['summary'] for e in filtered]
     
-    def test_filter_events_case_insensitive(self, setup_test_environment):
+    def test_filter_events_case_insensitive(self, setup_test_environment, stub_service):
         """Filter sind case-insensitive."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         events = [
             {'summary': 'VORLESUNG', 'description': '', 'location': '', 'start': {}, 'end': {}},
@@ -115,12 +108,11 @@ class TestEventFiltering:
         assert excluded_count == 3
         assert len(filtered) == 0
     
-    def test_filter_events_invalid_regex(self, sample_events, setup_test_environment):
+    def test_filter_events_invalid_regex(self, sample_events, setup_test_environment, stub_service):
         """Ungültige Regex-Patterns werden ignoriert."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         # Ungültiges Regex-Pattern
         patterns = [r'[invalid(', r'Feiertag']
@@ -133,12 +125,11 @@ class TestEventFiltering:
 class TestEventHashing:
     """Event-Hashing für Delta-Sync."""
     
-    def test_compute_event_hash_deterministic(self, setup_test_environment):
+    def test_compute_event_hash_deterministic(self, setup_test_environment, stub_service):
         """Gleiche Events erzeugen gleichen Hash."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         event = {
             'summary': 'Test Event',
@@ -153,12 +144,11 @@ class TestEventHashing:
         
         assert hash1 == hash2
     
-    def test_compute_event_hash_different_for_different_events(self, setup_test_environment):
+    def test_compute_event_hash_different_for_different_events(self, setup_test_environment, stub_service):
         """Unterschiedliche Events erzeugen unterschiedliche Hashes."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         event1 = {
             'summary': 'Event A',
@@ -178,12 +168,30 @@ class TestEventHashing:
         
         assert syncer._compute_event_hash(event1) != syncer._compute_event_hash(event2)
     
-    def test_get_event_key(self, setup_test_environment):
+    def test_compute_event_hash_includes_timezone(self, setup_test_environment, stub_service):
+        """Eine reine Änderung der timeZone ändert den Hash."""
+        from sync_logic import CalendarSyncer
+        
+        syncer = CalendarSyncer(stub_service)
+        
+        event = {
+            'summary': 'Event A',
+            'start': {'dateTime': '2026-01-21T09:00:00', 'timeZone': 'Europe/Berlin'},
+            'end': {'dateTime': '2026-01-21T10:00:00', 'timeZone': 'Europe/Berlin'},
+        }
+        moved = {
+            'summary': 'Event A',
+            'start': {'dateTime': '2026-01-21T09:00:00', 'timeZone': 'Europe/London'},
+            'end': {'dateTime': '2026-01-21T10:00:00', 'timeZone': 'Europe/London'},
+        }
+        
+        assert syncer._compute_event_hash(event) != syncer._compute_event_hash(moved)
+    
+    def test_get_event_key(self, setup_test_environment, stub_service):
         """Event-Key kombiniert Startzeit und Titel."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         event = {
             'summary': 'Vorlesung',
@@ -200,7 +208,7 @@ class TestEventHashing:
 class TestCaching:
     """Cache-Persistierung."""
     
-    def test_cache_save_and_load(self, temp_data_dir, setup_test_environment):
+    def test_cache_save_and_load(self, temp_data_dir, setup_test_environment, stub_service):
         """Cache wird gespeichert und geladen."""
         from sync_logic import CalendarSyncer
         import sync_logic
@@ -209,8 +217,7 @@ class TestCaching:
         sync_logic.CACHE_DIR = str(temp_data_dir / '.cache')
         os.makedirs(sync_logic.CACHE_DIR, exist_ok=True)
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='cache-test-user')
+        syncer = CalendarSyncer(stub_service, user_id='cache-test-user')
         
         test_data = {'key': 'value', 'number': 42}
         syncer._save_cache('test', test_data)
@@ -219,15 +226,14 @@ class TestCaching:
         
         assert loaded == test_data
     
-    def test_cache_load_non_existent(self, temp_data_dir, setup_test_environment):
+    def test_cache_load_non_existent(self, temp_data_dir, setup_test_environment, stub_service):
         """Nicht existierender Cache liefert leeres Dict."""
         from sync_logic import CalendarSyncer
         import sync_logic
         
         sync_logic.CACHE_DIR = str(temp_data_dir / '.cache')
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='no-cache-user')
+        syncer = CalendarSyncer(stub_service, user_id='no-cache-user')
         
         loaded = syncer._load_cache('non-existent')
         
@@ -238,7 +244,25 @@ class TestICSParsing:
     """ICS-Kalender-Parsing."""
     
     @responses.activate
-    def test_fetch_ics_events_success(self, sample_ics_content, temp_data_dir, setup_test_environment):
+    def test_shared_http_session_rejects_cookies(self):
+        """Die geteilte ICS-Session speichert keine Cookies zwischen Usern."""
+        from sync_logic import get_http_session
+        
+        responses.add(
+            responses.GET,
+            'https://example.com/cookie.ics',
+            body='BEGIN:VCALENDAR',
+            headers={'Set-Cookie': 'session=geheim; Path=/'}
+        )
+        
+        session = get_http_session()
+        session.get('https://example.com/cookie.ics')
+        
+        assert session is get_http_session()
+        assert len(session.cookies) == 0
+    
+    @responses.activate
+    def test_fetch_ics_events_success(self, sample_ics_content, temp_data_dir, setup_test_environment, stub_service):
         """ICS-Events werden korrekt abgerufen."""
         from sync_logic import CalendarSyncer
         import sync_logic
@@ -255,8 +279,7 @@ class TestICSParsing:
             headers={'ETag': '"abc123"'}
         )
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='ics-test-user')
+        syncer = CalendarSyncer(stub_service, user_id='ics-test-user')
         
         events = syncer.fetch_ics_events(
             'https://example.com/calendar.ics',
@@ -268,7 +291,7 @@ class TestICSParsing:
         assert any('Feiertag' in e['summary'] for e in events)
     
     @responses.activate
-    def test_fetch_ics_events_uses_cache(self, sample_ics_content, temp_data_dir, setup_test_environment):
+    def test_fetch_ics_events_uses_cache(self, sample_ics_content, temp_data_dir, setup_test_environment, stub_service):
         """304 Not Modified nutzt den Cache."""
         from sync_logic import CalendarSyncer
         import sync_logic
@@ -276,8 +299,7 @@ class TestICSParsing:
         sync_logic.CACHE_DIR = str(temp_data_dir / '.cache')
         os.makedirs(sync_logic.CACHE_DIR, exist_ok=True)
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='cache-ics-user')
+        syncer = CalendarSyncer(stub_service, user_id='cache-ics-user')
         
         # Erstelle Cache manuell
         syncer._save_cache('ics', {
@@ -300,7 +322,7 @@ class TestICSParsing:
         assert len(events) == 3
     
     @responses.activate
-    def test_fetch_ics_timezone_override(self, temp_data_dir, setup_test_environment):
+    def test_fetch_ics_timezone_override(self, temp_data_dir, setup_test_environment, stub_service):
         """Source Timezone überschreibt existierende Timezones (Rewrite)."""
         from sync_logic import CalendarSyncer
         import sync_logic
@@ -333,8 +355,7 @@ END:VCALENDAR"""
             status=200,
         )
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='tz-test')
+        syncer = CalendarSyncer(stub_service, user_id='tz-test')
         
         # Wir setzen "Europe/Berlin" als Source Timezone
         events = syncer.fetch_ics_events(
@@ -357,7 +378,7 @@ END:VCALENDAR"""
         assert ny_event['start']['dateTime'].startswith('2026-01-21T14:00:00+01:00')
     
     @responses.activate
-    def test_fetch_ics_events_deduplicates(self, temp_data_dir, setup_test_environment):
+    def test_fetch_ics_events_deduplicates(self, temp_data_dir, setup_test_environment, stub_service):
         """Duplikate werden entfernt."""
         from sync_logic import CalendarSyncer
         import sync_logic
@@ -396,8 +417,7 @@ END:VCALENDAR"""
             status=200,
         )
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service, user_id='dedup-test')
+        syncer = CalendarSyncer(stub_service, user_id='dedup-test')
         
         events = syncer.fetch_ics_events(
             'https://example.com/duplicate.ics',
@@ -419,25 +439,23 @@ END:VCALENDAR"""
 class TestLogging:
     """Logging-System."""
     
-    def test_log_writes_to_system_log(self, setup_test_environment, capsys):
+    def test_log_writes_to_system_log(self, setup_test_environment, capsys, stub_service):
         """log() schreibt in stdout."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
-        syncer = CalendarSyncer(mock_service)
+        syncer = CalendarSyncer(stub_service)
         
         syncer.log("Test System Message")
         
         captured = capsys.readouterr()
         assert "Test System Message" in captured.out
     
-    def test_log_writes_to_user_log_file(self, temp_data_dir, setup_test_environment):
+    def test_log_writes_to_user_log_file(self, temp_data_dir, setup_test_environment, stub_service):
         """log() mit user_message schreibt in Datei."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
         user_log_path = temp_data_dir / 'user.log'
-        syncer = CalendarSyncer(mock_service, user_log_file=str(user_log_path))
+        syncer = CalendarSyncer(stub_service, user_log_file=str(user_log_path))
         
         syncer.log("Technical message", user_message="Benutzerfreundliche Nachricht")
         
@@ -445,13 +463,12 @@ class TestLogging:
         content = user_log_path.read_text()
         assert "Benutzerfreundliche Nachricht" in content
     
-    def test_log_user_writes_same_message_to_both(self, temp_data_dir, setup_test_environment, capsys):
+    def test_log_user_writes_same_message_to_both(self, temp_data_dir, setup_test_environment, capsys, stub_service):
         """log_user() schreibt in beide Logs."""
         from sync_logic import CalendarSyncer
         
-        mock_service = MagicMock()
         user_log_path = temp_data_dir / 'user.log'
-        syncer = CalendarSyncer(mock_service, user_log_file=str(user_log_path))
+        syncer = CalendarSyncer(stub_service, user_log_file=str(user_log_path))
         
         syncer.log_user("Sync erfolgreich abgeschlossen")
         
@@ -462,3 +479,18 @@ class TestLogging:
         # User-Log (Datei)
         content = user_log_path.read_text()
         assert "Sync erfolgreich abgeschlossen" in content
+    
+    def test_rotate_log_keeps_last_1000_lines(self, tmp_path, setup_test_environment, stub_service):
+        """Große User-Logs werden auf die letzten 1000 Zeilen gekürzt."""
+        from sync_logic import CalendarSyncer
+        
+        user_log_path = tmp_path / 'user.log'
+        user_log_path.write_text(''.join(f"Zeile {i:05d} {'x' * 200}\n" for i in range(5000)))
+        syncer = CalendarSyncer(stub_service, user_log_file=str(user_log_path))
+        
+        syncer._rotate_log_if_needed()
+        
+        lines = user_log_path.read_text().splitlines()
+        assert len(lines) == 1000
+        assert lines[0].startswith("Zeile 04000")
+        assert lines[-1].startswith("Zeile 04999")
@@ -26,6 +26,84 @@ class TestPublicRoutes:
         
         assert response.status_code == 200
     
+    def test_legal_page_cacheable(self, client):
+        """Rechtstexte sind cachebar und unterstützen If-None-Match."""
+        response = client.get('/privacy')
+        
+        assert 'public' in response.headers['Cache-Control']
+        etag = response.headers['ETag']
+        
+        revalidated = client.get('/privacy', headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304
+    
+    def test_legal_page_rerenders_after_change(self, client, tmp_path, monkeypatch):
+        """Geänderte Markdown-Datei wird trotz Render-Cache neu ausgeliefert."""
+        import os
+        import web_server
+        
+        md_file = tmp_path / 'terms.md'
+        md_file.write_text('Version eins', encoding='utf-8')
+        monkeypatch.setattr(web_server, 'CONTENT_DIR', str(tmp_path))
+        
+        assert b'Version eins' in client.get('/terms').data
+        
+        md_file.write_text('Version zwei', encoding='utf-8')
+        stat = md_file.stat()
+        os.utime(md_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        
+        assert b'Version zwei' in client.get('/terms').data
+    
+    def test_legal_page_prefix_not_cached_for_others(self, client):
+        """Ein per X-Forwarded-Prefix gesetzter Pfad landet nicht in späteren Antworten."""
+        client.get('/privacy', headers={'X-Forwarded-Prefix': '//evil.example'})
+        
+        assert b'//evil.example' not in client.get('/privacy').data
+    
+    def test_favicon_cacheable(self, client):
+        """Favicon darf von Browsern eine Woche gecacht werden."""
+        response = client.get('/favicon.ico')
+        
+        assert response.status_code == 200
+        assert response.cache_control.public
+        assert response.cache_control.max_age == 604800
+        response.close()
+    
+    def test_legal_pages_not_rate_limited(self, client):
+        """Rechtstexte zählen nicht gegen das Standard-Limit (50 pro Stunde)."""
+        for _ in range(55):
+            response = client.get('/privacy')
+            assert response.status_code == 200
+    
+    def test_static_files_cacheable(self, client):
+        """Dateien unter /static erhalten dieselbe Cache-Dauer wie das Favicon."""
+        response = client.get('/static/favicon.ico')
+        
+        assert response.status_code == 200
+        assert response.cache_control.max_age == 604800
+        response.close()
+    
+    def test_logs_poll_revalidates_with_etag(self, client):
+        """/logs antwortet bei unverändertem Log mit 304."""
+        import os
+        import web_server
+        
+        log_path = os.path.join(web_server.DATA_DIR, 'logs-etag-user.log')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write("Zeile 1\n")
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'logs-etag-user'
+        
+        response = client.get('/logs')
+        assert response.get_json() == {'logs': ['Zeile 1']}
+        etag = response.headers['ETag']
+        
+        assert client.get('/logs', headers={'If-None-Match': etag}).status_code == 304
+        
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write("Zeile 2\n")
+        assert client.get('/logs', headers={'If-None-Match': etag}).status_code == 200
+        os.remove(log_path)
+    
     def test_nonexistent_route_returns_404(self, client):
         """Unbekannte Routen geben 404 zurück."""
         response = client.get('/nonexistent-page-xyz')
@@ -48,6 +126,22 @@ class TestProtectedRoutes:
             # Wenn 200, sollte es die Login-Seite sein
             assert response.status_code == 200
     
+    def test_login_page_shows_flash_despite_cache(self, client):
+        """Flash-Nachrichten erscheinen trotz gecachter Login-Seite genau einmal."""
+        client.get('/')
+        with client.session_transaction() as sess:
+            sess['_flashes'] = [('info', 'Erfolgreich abgemeldet.')]
+        
+        assert 'Erfolgreich abgemeldet.' in client.get('/').get_data(as_text=True)
+        assert 'Erfolgreich abgemeldet.' not in client.get('/').get_data(as_text=True)
+    
+    def test_login_page_cache_ignores_forwarded_prefix(self, client):
+        """Login-Seiten für fremde X-Forwarded-Prefix-Werte werden weder gecacht noch weitergegeben."""
+        prefixed = client.get('/', headers={'X-Forwarded-Prefix': '/fremd'}).get_data(as_text=True)
+        assert 'href="/fremd/privacy"' in prefixed
+        
+        assert '/fremd/' not in client.get('/').get_data(as_text=True)
+    
     def test_save_requires_login(self, client):
         """/save erfordert Login."""
         response = client.post('/save', data={
@@ -75,10 +169,10 @@ class TestProtectedRoutes:
 class TestCSRFProtection:
     """CSRF-Schutz."""
     
-    def test_csrf_token_in_forms(self, flask_app):
+    def test_csrf_token_in_forms(self, flask_app, monkeypatch):
         """Formulare enthalten CSRF-Token."""
         # CSRF für diesen Test wieder aktivieren
-        flask_app.config['WTF_CSRF_ENABLED'] = True
+        monkeypatch.setitem(flask_app.config, 'WTF_CSRF_ENABLED', True)
         client = flask_app.test_client()
         
         # Mock einen eingeloggten User
@@ -187,6 +281,36 @@ class TestErrorHandling:
         assert response.status_code == 405
 
 
+class TestSystemLogWriter:
+    """Gebündeltes Schreiben von system.log."""
+    
+    def test_flush_writes_queued_lines_in_order(self, tmp_path):
+        """flush() schreibt alle eingereihten Zeilen in Reihenfolge."""
+        from web_server import SystemLogWriter
+        
+        log_path = tmp_path / 'system.log'
+        writer = SystemLogWriter(str(log_path))
+        writer.write("erste")
+        writer.write("zweite")
+        writer.flush()
+        
+        assert log_path.read_text(encoding='utf-8') == "erste\nzweite\n"
+    
+    def test_full_queue_is_written_by_caller(self, tmp_path):
+        """Bei voller Queue schreibt der Aufrufer die wartenden Zeilen selbst."""
+        from web_server import SystemLogWriter
+        
+        log_path = tmp_path / 'system.log'
+        writer = SystemLogWriter(str(log_path), max_pending=2)
+        writer.write("eins")
+        writer.write("zwei")
+        writer.write("drei")
+        
+        assert log_path.read_text(encoding='utf-8').startswith("eins\nzwei\n")
+        writer.flush()
+        assert log_path.read_text(encoding='utf-8') == "eins\nzwei\ndrei\n"
+
+
 class TestDeleteAccount:
     """Account-Löschung."""
     
@@ -196,6 +320,27 @@ class TestDeleteAccount:
         
         assert response.status_code == 302
         assert '/login' in response.location
+    
+    def test_delete_account_removes_existing_files(self, client):
+        """Vorhandene Dateien werden gelöscht, fehlende übersprungen."""
+        import json
+        import os
+        import web_server
+        
+        data_file = os.path.join(web_server.DATA_DIR, 'delete-me.json')
+        log_file = os.path.join(web_server.DATA_DIR, 'delete-me.log')
+        with open(data_file, 'w') as f:
+            json.dump({'id': 'delete-me', 'email': 'weg@example.com'}, f)
+        with open(log_file, 'w') as f:
+            f.write("Log\n")
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'delete-me'
+        
+        response = client.post('/delete-account', data={'email_confirmation': 'weg@example.com'})
+        
+        assert response.status_code == 302
+        assert not os.path.exists(data_file)
+        assert not os.path.exists(log_file)
 
 
 class TestContentNegotiation:
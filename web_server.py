@@ -1,22 +1,30 @@
 import os
 import re
+import time
+import queue
+import atexit
 import logging
-import subprocess
+import threading
 import pytz
 import markdown
-from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from markupsafe import Markup
+import requests
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from functools import lru_cache
+from collections import OrderedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response, g, send_from_directory
+from markupsafe import Markup, escape
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
 from flask_wtf.csrf import CSRFProtect, CSRFError
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from google.oauth2 import id_token
 from googleapiclient.errors import HttpError
 from werkzeug.middleware.proxy_fix import ProxyFix
-from filelock import FileLock, Timeout
 
 # Lokale Module
 import config
@@ -24,33 +32,206 @@ from config import (
     DATA_DIR, CONTENT_DIR, GOOGLE_SCOPES,
     APP_BASE_URL, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, SECRET_KEY,
     encrypt,
-    RATE_LIMIT_DEFAULT, RATE_LIMIT_LOGIN, RATE_LIMIT_SYNC, RATE_LIMIT_LOGS
+    RATE_LIMIT_DEFAULT, RATE_LIMIT_LOGIN, RATE_LIMIT_SYNC, RATE_LIMIT_LOGS,
+    RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STRATEGY
 )
-from models import User
-from sync_logic import CalendarSyncer
+from models import User, invalidate_credentials, get_id_token_request, start_token_refresher
+from sync_logic import CalendarSyncer, build_calendar_service, compile_filter_pattern, get_http_session
+import sync_all_users
 
 config.init()
 
+# Cache-Dauer für Datenschutz/Impressum (Sekunden)
+LEGAL_PAGE_MAX_AGE = 86400
+# Favicon ist nicht versioniert: eine Woche statt "immutable", damit ein neues Icon noch ankommt
+FAVICON_MAX_AGE = 604800
+
+# /logs-Caches pro Worker: max. Anzahl gecachter Log-Dateien und Anzahl der Single-Flight-Locks
+LOG_CACHE_SIZE = 256
+LOG_TAIL_LOCK_COUNT = 16
+
+# Manuelle Syncs laufen im Prozess statt als Subprozess (kein Interpreter-Start pro Klick)
+_SYNC_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sync')
+
+# Content-Security-Policy mit fertig zusammengesetzten Quellen-Strings:
+# Talisman übernimmt str-Werte direkt statt Listen pro Response neu zu joinen
+CONTENT_SECURITY_POLICY = {
+    'default-src': "'self'",
+    'script-src': "'self' 'unsafe-inline' cdn.tailwindcss.com",
+    'style-src': "'self' 'unsafe-inline' cdn.tailwindcss.com fonts.googleapis.com",
+    'img-src': "'self' data: https:",
+    'font-src': "'self' data: fonts.gstatic.com",
+    'connect-src': "'self'",
+}
+
+# Markdown-Parser mit Extensions einmal aufbauen; Markdown-Instanzen sind nicht threadsicher
+_MARKDOWN = markdown.Markdown(extensions=['tables', 'fenced_code'])
+_MARKDOWN_LOCK = threading.Lock()
+
+# OAuth-Client-Konfiguration ist prozessweit konstant
+OAUTH_REDIRECT_URI = f"{APP_BASE_URL}/authorize"
+_OAUTH_CLIENT_CONFIG = {
+    "web": {
+        "client_id": GOOGLE_CLIENT_ID,
+        "client_secret": GOOGLE_CLIENT_SECRET,
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "redirect_uris": [OAUTH_REDIRECT_URI],
+    }
+}
+
+
+def _build_timezone_options(now_utc):
+    """Rendert die <option>-Liste aller Zeitzonen (mit Offset, sortiert) einmalig als HTML."""
+    # Berechne Offsets für alle Zeitzonen für bessere UX
+    timezones_with_offset = []
+    for tz_name in pytz.common_timezones:
+        # astimezone statt localize: kein Fehlerpfad bei mehrdeutigen/nicht existierenden Zeiten;
+        # zoneinfo (C-Implementierung) mit pytz als Fallback, falls die tz-Datenbank fehlt
+        try:
+            tz = ZoneInfo(tz_name)
+        except ZoneInfoNotFoundError:
+            tz = pytz.timezone(tz_name)
+        offset = now_utc.astimezone(tz).utcoffset()
+        
+        # Formatierung: (+HH:MM) oder (-HH:MM)
+        total_seconds = int(offset.total_seconds())
+        sign = "+" if total_seconds >= 0 else "-"
+        hours, remainder = divmod(abs(total_seconds), 3600)
+        minutes, _ = divmod(remainder, 60)
+        
+        offset_str = f"({sign}{hours:02d}:{minutes:02d})"
+        # Verwende Non-Breaking Spaces für Abstand
+        display_str = f"{tz_name}   {offset_str}"
+        
+        timezones_with_offset.append({
+            'value': tz_name,
+            'label': display_str,
+            'offset_seconds': total_seconds  # Für Sortierung
+        })
+    
+    # Sortiere nach Offset (aufsteigend) und dann alphabetisch nach Name
+    timezones_display = sorted(timezones_with_offset, key=lambda x: (x['offset_seconds'], x['value']))
+    return Markup(''.join(
+        f'<option value="{escape(tz["value"])}">{escape(tz["label"])}</option>'
+        for tz in timezones_display
+    ))
+
+
+# Offsets ändern sich nur bei DST-Wechseln (auch zur halben Stunde UTC): Liste für 15 Minuten cachen
+TIMEZONE_OPTIONS_TTL_MINUTES = 15
+
+
+@lru_cache(maxsize=1)
+def _timezone_options_for_slot(slot_start):
+    return _build_timezone_options(slot_start)
+
+
+def timezone_options(selected):
+    """<option>-HTML für das Zeitzonen-Dropdown mit vorausgewählter Zeitzone."""
+    now = datetime.now(timezone.utc)
+    slot_start = now.replace(
+        minute=now.minute - now.minute % TIMEZONE_OPTIONS_TTL_MINUTES, second=0, microsecond=0
+    )
+    options_html = str(_timezone_options_for_slot(slot_start))
+    needle = f'<option value="{escape(selected)}">'
+    return Markup(options_html.replace(needle, needle[:-1] + ' selected>', 1))
+
+
+class SystemLogWriter:
+    """Schreibt system.log-Zeilen gebündelt aus einem Hintergrund-Thread.
+    
+    Request-Handler legen Zeilen nur in eine Queue; der Thread schreibt alle
+    FLUSH_INTERVAL Sekunden gesammelt über ein dauerhaft offenes Datei-Handle.
+    """
+    
+    FLUSH_INTERVAL = 0.2
+    MAX_PENDING = 10000
+    
+    def __init__(self, path, max_pending=MAX_PENDING):
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = threading.Event()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._handle = None
+    
+    def write(self, line):
+        """Reiht eine Zeile (ohne Zeilenumbruch) zum Schreiben ein."""
+        try:
+            self._queue.put_nowait(line + '\n')
+        except queue.Full:
+            # Writer-Thread hängt hinterher: selbst schreiben statt unbegrenzt zu puffern
+            self.flush()
+            self._queue.put(line + '\n')
+        self._pending.set()
+        if self._thread is None:
+            self._start()
+    
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='system-log', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+    
+    def _run(self):
+        while True:
+            self._pending.wait()
+            time.sleep(self.FLUSH_INTERVAL)
+            self._pending.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logging.getLogger('gunicorn.error').error(f"Fehler beim Schreiben in system.log: {exc}")
+    
+    def flush(self):
+        """Schreibt alle wartenden Zeilen mit einem write()-Aufruf."""
+        # Leeren und Schreiben unter einem Lock: ein paralleles flush() (z.B. atexit) kehrt
+        # erst zurück, wenn auch die vom Writer-Thread entnommenen Zeilen geschrieben sind
+        with self._write_lock:
+            lines = []
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not lines:
+                return
+            if self._handle is None:
+                self._handle = open(self.path, 'a', encoding='utf-8')
+            self._handle.write(''.join(lines))
+            self._handle.flush()
+
+
+SYSTEM_LOG = SystemLogWriter(os.path.join(DATA_DIR, 'system.log'))
+
+
+def health_check_middleware(wsgi_app):
+    """Beantwortet /health direkt auf WSGI-Ebene (ohne Routing, Request-Kontext, Talisman, Limiter)."""
+    def wrapper(environ, start_response):
+        method = environ.get('REQUEST_METHOD')
+        if environ.get('PATH_INFO') == '/health' and method in ('GET', 'HEAD'):
+            start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '2')])
+            return [] if method == 'HEAD' else [b'OK']
+        return wsgi_app(environ, start_response)
+    return wrapper
+
 
 def get_app():
     app = Flask(__name__)
     app.secret_key = SECRET_KEY
+    # /static/* (u.a. das in base.html verlinkte Favicon) wie /favicon.ico cachen lassen
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = FAVICON_MAX_AGE
     
     # CSRF-Schutz aktivieren
     CSRFProtect(app)
     
     # Security Headers
-    csp = {
-        'default-src': "'self'",
-        'script-src': ["'self'", "'unsafe-inline'", 'cdn.tailwindcss.com'],
-        'style-src': ["'self'", "'unsafe-inline'", 'cdn.tailwindcss.com', 'fonts.googleapis.com'],
-        'img-src': ["'self'", 'data:', 'https:'],
-        'font-src': ["'self'", 'data:', 'fonts.gstatic.com'],
-        'connect-src': ["'self'"],
-    }
     Talisman(
         app,
-        content_security_policy=csp,
+        content_security_policy=CONTENT_SECURITY_POLICY,
         force_https=False,  # HTTPS wird vom Reverse Proxy gehandhabt
         session_cookie_secure=True,
         session_cookie_http_only=True,
@@ -63,15 +244,25 @@ def get_app():
         key_func=get_remote_address,
         app=app,
         default_limits=RATE_LIMIT_DEFAULT,
-        storage_uri="memory://",
+        storage_uri=RATE_LIMIT_STORAGE_URI,
+        # Standard fixed-window: konstanter Speicher pro IP und Limit statt eines
+        # Zeitstempels pro Treffer; moving-window per RATE_LIMIT_STRATEGY wählbar
+        strategy=RATE_LIMIT_STRATEGY,
+        # Bei nicht erreichbarem Backend pro Worker im Speicher weiterzählen statt Requests abzulehnen
+        in_memory_fallback_enabled=True,
     )
     
     gunicorn_logger = logging.getLogger('gunicorn.error')
     app.logger.handlers = gunicorn_logger.handlers
     app.logger.setLevel(gunicorn_logger.level)
 
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
+    app.wsgi_app = health_check_middleware(
+        ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
+    )
     
+    # Access-Tokens aktiver User im Hintergrund erneuern statt im Request-Pfad
+    start_token_refresher()
+
     login_manager = LoginManager()
     login_manager.init_app(app)
     login_manager.login_view = 'login'
@@ -79,7 +270,7 @@ def get_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User(user_id)
+        return User.get_cached(user_id)
 
     # CSRF-Fehlerbehandlung
     @app.errorhandler(CSRFError)
@@ -87,30 +278,47 @@ def get_app():
         flash('Sicherheitsfehler: Ungültiges oder abgelaufenes Formular-Token. Bitte erneut versuchen.', 'error')
         return redirect(url_for('index'))
 
+    # Statische, für alle gleiche Inhalte: keine Rate-Limit-Zählung (ein Storage-Zugriff weniger je Abruf)
     @app.route('/favicon.ico')
+    @limiter.exempt
     def favicon():
-        return app.send_static_file('favicon.ico')
+        # send_from_directory setzt public + max-age, nutzt wsgi.file_wrapper und beantwortet If-None-Match mit 304
+        return send_from_directory(app.static_folder, 'favicon.ico', max_age=FAVICON_MAX_AGE, conditional=True)
 
-    @app.route('/health')
-    def health_check():
-        return "OK", 200
+    # Konvertierte Rechtstexte: md_filename -> (mtime_ns, HTML des Markdown-Inhalts).
+    # Nur der Inhalt wird gecacht; das Template (url_for-Links abhängig vom Pfad-Präfix) pro Request
+    legal_page_cache = {}
 
     def render_markdown_page(md_filename, title):
-        """Lädt eine Markdown-Datei und rendert sie als HTML."""
+        """Lädt eine Markdown-Datei und rendert sie als HTML (Konvertierung neu nur bei geänderter Datei)."""
         md_path = os.path.join(CONTENT_DIR, md_filename)
         try:
-            with open(md_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-            html_content = markdown.markdown(md_content, extensions=['tables', 'fenced_code'])
-            return render_template('legal_page.html', title=title, content=Markup(html_content))
+            mtime_ns = os.stat(md_path).st_mtime_ns
+            cached = legal_page_cache.get(md_filename)
+            if cached is not None and cached[0] == mtime_ns:
+                html_content = cached[1]
+            else:
+                with open(md_path, 'r', encoding='utf-8') as f:
+                    md_content = f.read()
+                with _MARKDOWN_LOCK:
+                    html_content = _MARKDOWN.reset().convert(md_content)
+                legal_page_cache[md_filename] = (mtime_ns, html_content)
+            page_html = render_template('legal_page.html', title=title, content=Markup(html_content))
+            response = make_response(page_html)
+            # Statische Rechtstexte: Browser/Proxies dürfen cachen, ETag erlaubt 304-Revalidierung
+            response.headers['Cache-Control'] = f'public, max-age={LEGAL_PAGE_MAX_AGE}'
+            response.add_etag()
+            return response.make_conditional(request)
         except FileNotFoundError:
             return f"Datei {md_filename} nicht gefunden.", 404
 
     @app.route('/privacy')
+    @limiter.exempt
     def privacy_policy():
         return render_markdown_page('privacy.md', 'Datenschutzerklärung')
 
     @app.route('/terms')
+    @limiter.exempt
     def terms_of_service():
         return render_markdown_page('terms.md', 'Nutzungsbedingungen & Impressum')
 
@@ -118,17 +326,9 @@ def get_app():
 
     def get_oauth_flow():
         return Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": GOOGLE_CLIENT_ID,
-                    "client_secret": GOOGLE_CLIENT_SECRET,
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token",
-                    "redirect_uris": [f"{APP_BASE_URL}/authorize"],
-                }
-            },
+            _OAUTH_CLIENT_CONFIG,
             scopes=GOOGLE_SCOPES,
-            redirect_uri=f"{APP_BASE_URL}/authorize"
+            redirect_uri=OAUTH_REDIRECT_URI
         )
 
     @app.route('/login')
@@ -150,7 +350,7 @@ def get_app():
             
             # Rekonstruiere die korrekte authorization_response URL
             # request.url kann hinter einem Reverse Proxy falsch sein (http statt https)
-            authorization_response = f"{APP_BASE_URL}/authorize?{request.query_string.decode('utf-8')}"
+            authorization_response = f"{OAUTH_REDIRECT_URI}?{request.query_string.decode('utf-8')}"
             
             flow.fetch_token(
                 authorization_response=authorization_response,
@@ -164,10 +364,8 @@ def get_app():
         creds = flow.credentials
         
         try:
-            from google.oauth2 import id_token
-            from google.auth.transport.requests import Request as GoogleRequest
             id_info = id_token.verify_oauth2_token(
-                creds.id_token, GoogleRequest(), GOOGLE_CLIENT_ID
+                creds.id_token, get_id_token_request(), GOOGLE_CLIENT_ID
             )
             user_id = id_info['sub'] 
             email = id_info['email']
@@ -198,6 +396,8 @@ def get_app():
     @app.route('/logout')
     @login_required
     def logout():
+        if current_user.is_authenticated:
+            invalidate_credentials(current_user.id)
         logout_user()
         flash("Erfolgreich abgemeldet.", "info")
         return redirect(url_for('index'))
@@ -213,32 +413,23 @@ def get_app():
             return redirect(url_for('index'))
         
         try:
-            user_data_file = current_user.data_file
-            user_log_file = os.path.join(DATA_DIR, f"{current_user.id}.log")
-            user_lock_file = os.path.join(DATA_DIR, f"{current_user.id}.sync.lock")
-            cache_dir = os.path.join(DATA_DIR, '.cache')
+            user_files = [current_user.data_file, current_user.log_file, current_user.lock_file,
+                          *current_user.cache_files]
+            user_log_file = current_user.log_file
             user_id_log = current_user.id
             user_email_log = current_user.data.get('email', 'N/A')
 
             logout_user() 
+            invalidate_credentials(user_id_log)
+            forget_log_caches(user_log_file)
 
-            # Konfigurationsdatei löschen
-            if os.path.exists(user_data_file):
-                os.remove(user_data_file)
-            
-            # Log-Datei löschen
-            if os.path.exists(user_log_file):
-                os.remove(user_log_file)
-            
-            # Lock-Datei löschen
-            if os.path.exists(user_lock_file):
-                os.remove(user_lock_file)
-            
-            # Cache-Dateien löschen
-            for cache_type in ['ics', 'events']:
-                cache_file = os.path.join(cache_dir, f"{user_id_log}_{cache_type}.json")
-                if os.path.exists(cache_file):
-                    os.remove(cache_file)
+            # Konfiguration, Log, Lock und Cache-Dateien löschen
+            # (direkt unlink statt exists-Prüfung: ein Syscall pro Datei, kein TOCTOU)
+            for path in user_files:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
 
             app.logger.info(f"BENUTZERKONTO GELÖSCHT: {user_email_log} (ID: {user_id_log})")
             
@@ -258,98 +449,157 @@ def get_app():
         return redirect(url_for('index'))
 
     # Anwendungs-Routen
+    # Zuletzt gelesene Log-Enden: (filepath, n) -> ((mtime_ns, size), lines); LRU mit LOG_CACHE_SIZE Einträgen
+    log_tail_cache = OrderedDict()
+    # Serialisierte /logs-Antwort: filepath -> (etag, JSON-Body); LRU wie log_tail_cache
+    logs_body_cache = OrderedDict()
+    log_cache_lock = threading.Lock()
+    # Single-Flight: pro Log-Datei liest nur ein Request, parallele Polls warten auf dessen Ergebnis.
+    # Feste Anzahl Locks (per Hash gewählt) statt eines Locks pro jemals gelesener Datei
+    log_tail_locks = [threading.Lock() for _ in range(LOG_TAIL_LOCK_COUNT)]
+
+    def log_cache_get(cache, key):
+        with log_cache_lock:
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+            return entry
+
+    def log_cache_put(cache, key, entry):
+        with log_cache_lock:
+            cache[key] = entry
+            cache.move_to_end(key)
+            while len(cache) > LOG_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    def forget_log_caches(filepath):
+        """Entfernt alle gecachten Log-Daten einer Datei (z.B. nach Kontolöschung)."""
+        with log_cache_lock:
+            logs_body_cache.pop(filepath, None)
+            for key in [key for key in log_tail_cache if key[0] == filepath]:
+                del log_tail_cache[key]
+
+    def read_log_tail(filepath, n):
+        """Liest die letzten n nicht-leeren Zeilen blockweise vom Dateiende."""
+        with open(filepath, 'rb') as f:
+            # Blockweise (8 KB) vom Ende lesen, bis n Zeilen zusammen sind (max. 64 KB)
+            f.seek(0, 2)
+            file_size = f.tell()
+            stop = max(file_size - 65536, 0)
+            position = file_size
+            blocks = []
+            newlines = 0
+            while position > stop and newlines <= n:
+                read_size = min(8192, position - stop)
+                position -= read_size
+                f.seek(position)
+                block = f.read(read_size)
+                newlines += block.count(b'\n')
+                blocks.append(block)
+        content = b''.join(reversed(blocks)).decode('utf-8', errors='ignore')
+        
+        lines = content.splitlines()
+        return [line.strip() for line in lines[-n:] if line.strip()]
+
     def get_log_lines_for_file(filepath, n=50):
-        if not os.path.exists(filepath):
-            return ["Noch keine Logs für diesen Benutzer erstellt. Starten Sie einen Sync."]
         try:
-            # Effizientes Lesen der letzten n Zeilen (ohne gesamte Datei zu laden)
-            with open(filepath, 'rb') as f:
-                # Gehe ans Ende der Datei
-                f.seek(0, 2)
-                file_size = f.tell()
-                
-                if file_size == 0:
-                    return ["Log-Datei ist leer."]
-                
-                # Lese max 64KB vom Ende (sollte für 50 Zeilen reichen)
-                read_size = min(file_size, 65536)
-                f.seek(-read_size, 2)
-                content = f.read().decode('utf-8', errors='ignore')
-                
-                lines = content.splitlines()
-                return [line.strip() for line in lines[-n:] if line.strip()]
-        except Exception as e:
-            return [f"Fehler beim Lesen der Log-Datei: {e}"]
+            st = os.stat(filepath)
+        except OSError:
+            return ["Noch keine Logs für diesen Benutzer erstellt. Starten Sie einen Sync."]
+        if st.st_size == 0:
+            return ["Log-Datei ist leer."]
+        
+        key = (filepath, n)
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = log_cache_get(log_tail_cache, key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        with log_tail_locks[hash(filepath) % LOG_TAIL_LOCK_COUNT]:
+            # Ein paralleler Request hat die Datei eventuell gerade gelesen
+            cached = log_cache_get(log_tail_cache, key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            try:
+                result = read_log_tail(filepath, n)
+            except Exception as e:
+                return [f"Fehler beim Lesen der Log-Datei: {e}"]
+            log_cache_put(log_tail_cache, key, (signature, result))
+        return result
 
     @app.route('/logs')
     @limiter.limit(RATE_LIMIT_LOGS)
     @login_required
     def get_logs():
-        user_log_file = os.path.join(DATA_DIR, f"{current_user.id}.log")
-        logs = get_log_lines_for_file(user_log_file, n=50) 
-        return jsonify({'logs': logs})
+        user_log_file = current_user.log_file
+        # ETag aus mtime+size: unveränderte Logs beim Polling mit 304 beantworten
+        try:
+            st = os.stat(user_log_file)
+            etag = f"{st.st_mtime_ns}-{st.st_size}"
+        except OSError:
+            etag = "empty"
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            # JSON-Body pro Log-Stand nur einmal serialisieren (weitere Tabs/Clients ohne ETag)
+            cached = log_cache_get(logs_body_cache, user_log_file)
+            if cached is not None and cached[0] == etag:
+                body = cached[1]
+            else:
+                body = app.json.dumps({'logs': get_log_lines_for_file(user_log_file, n=50)})
+                log_cache_put(logs_body_cache, user_log_file, (etag, body))
+            response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    # Gerenderte Login-Seite, nur für den Pfad-Präfix aus APP_BASE_URL: X-Forwarded-Prefix
+    # kommt vom Client und ändert die url_for-Links, andere Präfixe werden nicht gecacht
+    login_page_prefix = urlsplit(APP_BASE_URL).path.rstrip('/')
+    login_page_cache = {}
 
     @app.route('/')
     def index():
         if not current_user.is_authenticated:
-            return render_template('login.html')
+            # Ohne Flash-Nachrichten ist die Login-Seite für alle anonymen Besucher gleich
+            if '_flashes' in session or request.script_root != login_page_prefix:
+                return render_template('login.html')
+            page_html = login_page_cache.get('login.html')
+            if page_html is None:
+                page_html = render_template('login.html')
+                login_page_cache['login.html'] = page_html
+            return page_html
         
         if not current_user.data.get('has_accepted_disclaimer'):
             return render_template('info_page.html')
         
-        user_log_file = os.path.join(DATA_DIR, f"{current_user.id}.log")
+        user_log_file = current_user.log_file
         initial_logs = get_log_lines_for_file(user_log_file, n=50)
 
-        # Berechne Offsets für alle Zeitzonen für bessere UX
-        timezones_with_offset = []
-        # Verwende naive UTC-Zeit für pytz.localize()
-        now_naive = datetime.now(tz=pytz.utc).replace(tzinfo=None)
-        for tz_name in pytz.common_timezones:
-            try:
-                tz = pytz.timezone(tz_name)
-                # Lokalisiere naive Zeit in die Zeitzone, dann hole Offset
-                localized_dt = tz.localize(now_naive, is_dst=None)
-                offset = localized_dt.utcoffset()
-                
-                # Formatierung: (+HH:MM) oder (-HH:MM)
-                total_seconds = int(offset.total_seconds())
-                sign = "+" if total_seconds >= 0 else "-"
-                hours, remainder = divmod(abs(total_seconds), 3600)
-                minutes, _ = divmod(remainder, 60)
-                
-                offset_str = f"({sign}{hours:02d}:{minutes:02d})"
-                # Verwende Non-Breaking Spaces für Abstand
-                display_str = f"{tz_name}   {offset_str}"
-                
-                timezones_with_offset.append({
-                    'value': tz_name,
-                    'label': display_str,
-                    'offset_seconds': total_seconds  # Für Sortierung
-                })
-            except Exception as e:
-                # Fallback bei Fehlern (z.B. bei mehrdeutigen Zeiten)
-                timezones_with_offset.append({
-                    'value': tz_name,
-                    'label': tz_name,
-                    'offset_seconds': 0
-                })
-        
-        # Sortiere nach Offset (aufsteigend) und dann alphabetisch nach Name
-        timezones_display = sorted(timezones_with_offset, key=lambda x: (x['offset_seconds'], x['value']))
-        
+        config = current_user.get_config()
         return render_template('dashboard.html', 
-                               config=current_user.get_config(),
+                               config=config,
                                logs=initial_logs,
-                               timezones=timezones_display)
+                               timezone_options=timezone_options(config['source_timezone']))
+
+    def _get_request_calendar_service():
+        """Calendar-Service des aktuellen Users, einmal pro Request gebaut (None ohne Anmeldedaten).
+        
+        Liegt in g statt in einem prozessweiten Cache, da Resource-Objekte nicht threadsicher sind.
+        """
+        if 'calendar_service' not in g:
+            creds = current_user.get_credentials()
+            g.calendar_service = build_calendar_service(creds) if creds else None
+        return g.calendar_service
 
     def _validate_calendar_access(calendar_id, calendar_name):
         """Prüft ob der User Zugriff auf den Kalender hat. Gibt Fehlermeldung oder None zurück."""
         try:
-            creds = current_user.get_credentials()
-            if not creds:
+            service = _get_request_calendar_service()
+            if not service:
                 return f"{calendar_name}: Keine gültigen Anmeldedaten. Bitte erneut einloggen."
             
-            service = build('calendar', 'v3', credentials=creds)
             # Versuche Kalender-Metadaten abzurufen
             service.calendars().get(calendarId=calendar_id).execute()
             return None  # Kein Fehler
@@ -363,21 +613,32 @@ def get_app():
         except Exception as e:
             return f"{calendar_name}: Validierung fehlgeschlagen ({e})."
 
+    def _fetch_ics_head(url, limit, timeout):
+        """Lädt nur die ersten `limit` Bytes (dekomprimiert) einer ICS-URL als Text.
+        
+        Streamt die Antwort und bricht danach ab, statt mehrere MB herunterzuladen.
+        Netzwerk- und HTTP-Fehler werden an den Aufrufer weitergereicht.
+        """
+        headers = {
+            'User-Agent': 'DHBW-Calendar-Cleaner/1.0 (https://github.com/STAINCABLER/DHBW_Calendar_Cleaner)',
+            'Accept': 'text/calendar, */*'
+        }
+        with get_http_session().get(url, timeout=timeout, headers=headers, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            # iter_content dekomprimiert gzip automatisch
+            head = b''
+            for chunk in response.iter_content(chunk_size=limit):
+                head += chunk
+                if len(head) >= limit:
+                    break
+            return head[:limit].decode(response.encoding or 'utf-8', errors='ignore')
+
     def _validate_ics_url(url):
         """Prüft ob die ICS-URL erreichbar ist und gültiges ICS enthält. Gibt Fehlermeldung oder None zurück."""
-        import requests as req
         try:
-            headers = {
-                'User-Agent': 'DHBW-Calendar-Cleaner/1.0 (https://github.com/STAINCABLER/DHBW_Calendar_Cleaner)',
-                'Accept': 'text/calendar, */*'
-            }
-            response = req.get(url, timeout=15, headers=headers, allow_redirects=True)
-            response.raise_for_status()
-            
             # Lese die ersten 4KB um sicherzustellen dass wir VCALENDAR finden
             # (manche ICS-Dateien haben lange Header mit Kommentaren)
-            # Nutze response.text statt raw.read() damit gzip automatisch dekomprimiert wird
-            first_chunk = response.text[:4096]
+            first_chunk = _fetch_ics_head(url, 4096, timeout=15)
             
             if 'BEGIN:VCALENDAR' not in first_chunk:
                 # Prüfe ob es sich um eine HTML-Seite handelt (Login-Redirect)
@@ -386,38 +647,29 @@ def get_app():
                 return "Quellkalender: Die URL liefert keine gültige ICS-Datei (kein VCALENDAR gefunden)."
             
             return None  # Kein Fehler
-        except req.exceptions.Timeout:
+        except requests.exceptions.Timeout:
             return "Quellkalender: Die URL ist nicht erreichbar (Timeout nach 15 Sekunden)."
-        except req.exceptions.SSLError:
+        except requests.exceptions.SSLError:
             return "Quellkalender: SSL-Zertifikatsfehler. Bitte HTTPS-URL prüfen."
-        except req.exceptions.ConnectionError:
+        except requests.exceptions.ConnectionError:
             return "Quellkalender: Verbindung fehlgeschlagen. Bitte URL prüfen."
-        except req.exceptions.HTTPError as e:
+        except requests.exceptions.HTTPError as e:
             return f"Quellkalender: HTTP-Fehler {e.response.status_code}. Bitte URL prüfen."
         except Exception as e:
             return f"Quellkalender: Validierung fehlgeschlagen ({e})."
 
     def _detect_ics_timezone(url):
         """Versucht die Zeitzone aus einer ICS-URL zu erkennen. Gibt Zeitzone oder None zurück."""
-        import requests as req
         try:
-            headers = {
-                'User-Agent': 'DHBW-Calendar-Cleaner/1.0 (https://github.com/STAINCABLER/DHBW_Calendar_Cleaner)',
-                'Accept': 'text/calendar, */*'
-            }
-            response = req.get(url, timeout=10, headers=headers, allow_redirects=True)
-            response.raise_for_status()
-            
             # Lese die ersten 8KB um Zeitzone zu finden
-            content = response.text[:8192]
+            content = _fetch_ics_head(url, 8192, timeout=10)
             
             # Suche nach X-WR-TIMEZONE (Google Calendar, Apple)
-            import re
             x_wr_match = re.search(r'X-WR-TIMEZONE[;:]([^\r\n]+)', content)
             if x_wr_match:
                 tz = x_wr_match.group(1).strip()
                 # Prüfe ob gültige Zeitzone
-                if tz in pytz.all_timezones:
+                if tz in pytz.all_timezones_set:
                     return tz
             
             # Suche nach VTIMEZONE TZID
@@ -426,7 +678,7 @@ def get_app():
                 tz = vtimezone_match.group(1).strip()
                 # Entferne eventuelle Anführungszeichen
                 tz = tz.strip('"\'')
-                if tz in pytz.all_timezones:
+                if tz in pytz.all_timezones_set:
                     return tz
             
             return None
@@ -466,7 +718,8 @@ def get_app():
         invalid_patterns = []
         for pattern in regex_patterns:
             try:
-                re.compile(pattern)
+                # Gleicher Cache wie filter_events: der nächste Sync nutzt die kompilierten Muster
+                compile_filter_pattern(pattern)
             except re.error as e:
                 invalid_patterns.append(f"'{pattern}' ({e})")
 
@@ -526,13 +779,9 @@ def get_app():
             return redirect(url_for('index'))
 
         try:
-            # Ruft das Sync-Skript nur für den aktuellen User auf
+            # Sync nur für den aktuellen User im Hintergrund-Thread starten
             user_id = current_user.id
-            command = f"python /app/sync_all_users.py --user {user_id} >> /app/data/system.log 2>&1"
-            subprocess.Popen(
-                ['sh', '-c', command],
-                close_fds=True
-            )
+            _SYNC_POOL.submit(sync_all_users.run_for_user, user_id, log_func=sync_system_log)
             log_system_event(f"Manueller Sync durch User {user_id} gestartet.")
             flash("Manueller Sync für Ihr Konto gestartet. Das Log-Fenster wird aktualisiert.", 'info')
             return respond('ok')
@@ -542,13 +791,15 @@ def get_app():
             flash(message, 'error')
             return respond('error', message, http_status=500)
 
+    def append_system_log(line):
+        SYSTEM_LOG.write(line)
+
     def log_system_event(message):
-        timestamp = datetime.now().isoformat()
-        try:
-            with open(os.path.join(DATA_DIR, 'system.log'), 'a') as f:
-                f.write(f"[{timestamp}] WEB: {message}\n")
-        except Exception as exc:
-            app.logger.error(f"Fehler beim Schreiben in system.log: {exc}")
+        append_system_log(f"[{sync_all_users.log_timestamp()}] WEB: {message}")
+
+    def sync_system_log(message):
+        """Sync-Ausgaben landen wie beim früheren Subprozess in system.log."""
+        sync_all_users.log(message, writer=append_system_log)
 
     def sync_logger(message):
         app.logger.info(message)
@@ -582,13 +833,9 @@ def get_app():
             return respond('error', "Authentifizierung fehlgeschlagen.", http_status=401)
 
         try:
-            # Ruft das Sync-Skript mit --wipe Flag für den aktuellen User auf (asynchron)
+            # Löschung wie beim manuellen Sync im Hintergrund-Thread starten
             user_id = current_user.id
-            command = f"python /app/sync_all_users.py --user {user_id} --wipe >> /app/data/system.log 2>&1"
-            subprocess.Popen(
-                ['sh', '-c', command],
-                close_fds=True
-            )
+            _SYNC_POOL.submit(sync_all_users.run_for_user, user_id, wipe=True, log_func=sync_system_log)
             log_system_event(f"Zielkalender-Löschung durch User {user_id} gestartet.")
             flash("Zielkalender-Löschung gestartet. Das Log-Fenster wird aktualisiert.", 'info')
             return respond('ok')
@@ -615,7 +862,8 @@ def get_app():
                 return jsonify(payload), http_status
             return redirect(url_for('index'))
 
-        user_log_path = os.path.join(DATA_DIR, f"{current_user.id}.log")
+        user_log_path = current_user.log_file
+        syncer = None
         
         try:
             # Wir brauchen keinen echten Service für clear_cache
@@ -632,6 +880,16 @@ def get_app():
             message = f"Fehler beim Löschen des Sync-Cache: {e}"
             flash(message, 'error')
             return respond('error', message, http_status=500)
+        finally:
+            if syncer:
+                syncer.close()
+
+    # URL-Matcher direkt aufbauen statt beim ersten Request des Workers
+    app.url_map.update()
+
+    # Templates (inkl. base.html/macros.html) vorab kompilieren statt beim ersten Aufruf je Seite
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
 
     return app
 